@@ -6,6 +6,7 @@ from __future__ import annotations
 import gc
 import os
 import time
+import bisect
 import random
 import logging
 from enum import Enum
@@ -155,6 +156,16 @@ class GarbageCollectionSubsystem(AppSubsystem):
         #:   #     getset_descriptor @ 0x1062344d0
         LEAK_DEBUG = 'leak_debug'
 
+        #: Like :attr:`STANDARD`, but instead of leaving all garbage for
+        #: explicit passes, small young-generation passes are also run
+        #: during gameplay, limited to a small time budget per tick (see
+        #: :attr:`~GarbageCollectionSubsystem.INCREMENTAL_BUDGET`). This
+        #: keeps cyclic garbage from piling up over long stretches of
+        #: play (such as long team series) so full passes at
+        #: transitions stay short. Collected objects are not examined,
+        #: so no summaries or warnings about them are provided.
+        INCREMENTAL = 'incremental'
+
         #: In this mode, Python's garbage collection is left completely
         #: untouched. Use this if you want to do some sort of manual
         #: debugging/experimenting where our default logic would get in
@@ -163,6 +174,19 @@ class GarbageCollectionSubsystem(AppSubsystem):
         #: have already been made by other modes.
         DISABLED = 'disabled'
 
+    #: How often we consider running incremental passes in
+    #: :attr:`Mode.INCREMENTAL` mode (in seconds).
+    INCREMENTAL_INTERVAL = 0.1
+
+    #: Time budget for incremental passes per interval (in seconds).
+    #: We skip older-generation passes that we expect would exceed this.
+    INCREMENTAL_BUDGET = 0.002
+
+    #: Upper bounds (in seconds) of the buckets in
+    #: :attr:`pause_histogram`. A final bucket catches everything
+    #: longer.
+    PAUSE_BUCKETS = (0.0005, 0.001, 0.002, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25)
+
     _MODE_CONFIG_KEY = 'Garbage Collection Mode'
     _SCREEN_MSG_COLOR = (1.0, 0.8, 0.4)
 
@@ -175,7 +199,33 @@ class GarbageCollectionSubsystem(AppSubsystem):
         #: passed, etc.)
         self.last_actual_collect_time: float | None = None
 
+        #: Number of explicit collection passes actually run so far.
+        self.collect_count = 0
+
+        #: Total time in seconds spent in explicit collection passes
+        #: (including any examining/reporting of collected objects).
+        self.collect_duration_total = 0.0
+
+        #: Duration in seconds of the most recent explicit collection
+        #: pass, or None if there has not been one.
+        self.last_collect_duration: float | None = None
+
+        #: Number of incremental (young-generation) passes run so far in
+        #: :attr:`Mode.INCREMENTAL` mode.
+        self.incremental_collect_count = 0
+
+        #: Total time in seconds spent in incremental passes.
+        self.incremental_collect_duration_total = 0.0
+
+        #: Counts of all collection passes (explicit and incremental) by
+        #: duration; one entry per :attr:`PAUSE_BUCKETS` bound plus a
+        #: final one for longer passes.
+        self.pause_histogram = [0] * (len(self.PAUSE_BUCKETS) + 1)
+
         self._total_num_gc_objects = 0
+        self._incremental_timer: _babase.AppTimer | None = None
+        self._incremental_gen1_cost = 0.0
+        self._app_running = False
         self._last_collection_time: float | None = None
         self._showed_standard_mode_warning = False
         self._mode: GarbageCollectionSubsystem.Mode | None = None
@@ -183,6 +233,9 @@ class GarbageCollectionSubsystem(AppSubsystem):
     @override
     def on_app_running(self) -> None:
         """:meta private:"""
+        self._app_running = True
+        self._update_incremental_timer()
+
         # Inform the user if we're set to something besides standard
         # (so they don't forget to switch it back when done).
         if self._mode is not None and self._mode is not self.Mode.STANDARD:
@@ -295,6 +348,8 @@ class GarbageCollectionSubsystem(AppSubsystem):
 
         if self._mode is self.Mode.STANDARD:
             self._collect_standard(now)
+        elif self._mode is self.Mode.INCREMENTAL:
+            self._collect_incremental(now)
         elif self._mode is self.Mode.LEAK_DEBUG:
             self._collect_leak_debug(now)
         else:
@@ -328,8 +383,22 @@ class GarbageCollectionSubsystem(AppSubsystem):
         # substantial number of collections in a single cycle.
         gc_threshold = 50
 
+        # If there's no way we'd show a summary of what we collect
+        # (nothing visible at info level and we've already used our
+        # warning) there's no point saving it all just to do a second
+        # pass to kill it; do a single real pass instead.
+        summary_visible = gc_log.isEnabledFor(logging.INFO) or (
+            not self._showed_standard_mode_warning
+            and gc_log.isEnabledFor(logging.WARNING)
+        )
+
         starttime = now
-        num_affected_objs = gc.collect()
+        if summary_visible:
+            num_affected_objs = gc.collect()
+        else:
+            gc.set_debug(0)
+            num_affected_objs = gc.collect()
+            gc.set_debug(gc.DEBUG_SAVEALL)
         now2 = self.last_actual_collect_time = time.monotonic()
         duration = now2 - starttime
         self._total_num_gc_objects += num_affected_objs
@@ -389,6 +458,7 @@ class GarbageCollectionSubsystem(AppSubsystem):
                 ),
                 len(gc.garbage),
             )
+        self._note_collect_duration(time.monotonic() - starttime)
 
         # Report some general stats on what we just did.
         from_last = (
@@ -406,12 +476,78 @@ class GarbageCollectionSubsystem(AppSubsystem):
             obj_summary,
         )
 
+    def _collect_incremental(self, now: float) -> None:
+        starttime = now
+        num_affected_objs = gc.collect()
+        now2 = self.last_actual_collect_time = time.monotonic()
+        duration = now2 - starttime
+        self._total_num_gc_objects += num_affected_objs
+        self._note_collect_duration(duration)
+
+        from_last = (
+            ''
+            if self._last_collection_time is None
+            else f' from last {now - self._last_collection_time:.1f}s'
+        )
+        gc_log.info(
+            'Explicit gc pass handled %d objects%s in %.3fs (total: %d).',
+            num_affected_objs,
+            from_last,
+            duration,
+            self._total_num_gc_objects,
+        )
+
+    def _incremental_tick(self) -> None:
+        if self._mode is not self.Mode.INCREMENTAL or gc.isenabled():
+            return
+
+        # Mirror what Python's automatic collection would do: collect
+        # a generation once its count passes its threshold. We always
+        # allow young passes (they're cheap) but only do a gen-1 pass
+        # if we expect it to fit in what's left of our budget; it will
+        # otherwise wait for a later tick or the next explicit pass.
+        count0, count1, _count2 = gc.get_count()
+        threshold0, threshold1, _threshold2 = gc.get_threshold()
+        if count0 < threshold0:
+            return
+        starttime = time.monotonic()
+        self._total_num_gc_objects += gc.collect(0)
+        now = time.monotonic()
+        self._note_incremental_duration(now - starttime)
+
+        if count1 + 1 < threshold1:
+            return
+        if now - starttime + self._incremental_gen1_cost > (
+            self.INCREMENTAL_BUDGET
+        ):
+            return
+        self._total_num_gc_objects += gc.collect(1)
+        duration = time.monotonic() - now
+        self._note_incremental_duration(duration)
+
+        # Keep a smoothed estimate of what gen-1 passes cost us.
+        self._incremental_gen1_cost = (
+            0.8 * self._incremental_gen1_cost + 0.2 * duration
+        )
+
+    def _update_incremental_timer(self) -> None:
+        if self._mode is self.Mode.INCREMENTAL:
+            if self._incremental_timer is None:
+                self._incremental_timer = _babase.AppTimer(
+                    self.INCREMENTAL_INTERVAL,
+                    self._incremental_tick,
+                    repeat=True,
+                )
+        else:
+            self._incremental_timer = None
+
     def _collect_leak_debug(self, now: float) -> None:
         starttime = now
         num_affected_objs = gc.collect()
         now2 = self.last_actual_collect_time = time.monotonic()
         duration = now2 - starttime
         self._total_num_gc_objects += num_affected_objs
+        self._note_collect_duration(duration)
 
         # Just report some general stats on what we collected. The
         # debugging output from Python itself will be the most useful
@@ -429,6 +565,22 @@ class GarbageCollectionSubsystem(AppSubsystem):
             self._total_num_gc_objects,
         )
 
+    def _note_collect_duration(self, duration: float) -> None:
+        self.collect_count += 1
+        self.collect_duration_total += duration
+        self.last_collect_duration = duration
+        self._note_pause(duration)
+
+    def _note_incremental_duration(self, duration: float) -> None:
+        self.incremental_collect_count += 1
+        self.incremental_collect_duration_total += duration
+        self._note_pause(duration)
+
+    def _note_pause(self, duration: float) -> None:
+        self.pause_histogram[
+            bisect.bisect_left(self.PAUSE_BUCKETS, duration)
+        ] += 1
+
     def _apply_mode(self, mode: Mode) -> None:
         cls = type(mode)
         if mode is cls.DISABLED:
@@ -447,9 +599,19 @@ class GarbageCollectionSubsystem(AppSubsystem):
             # delete collected stuff after examining/reporting it.
             gc.disable()
             gc.set_debug(gc.DEBUG_SAVEALL)
+        elif mode is cls.INCREMENTAL:
+            # In this mode we turn off collect and run our own young
+            # passes on a timer; nothing gets saved for examination.
+            gc.disable()
+            gc.set_debug(0)
         else:
             assert_never(mode)
 
+        # Our timer can only exist once the app is running; if it's not
+        # yet, on_app_running() will take care of this.
+        if self._app_running:
+            self._update_incremental_timer()
+
     def _mode_from_config(self) -> Mode:
         cfg = _babase.app.config
         configval = cfg.get(self._MODE_CONFIG_KEY)
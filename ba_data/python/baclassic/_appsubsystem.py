@@ -31,6 +31,7 @@ if TYPE_CHECKING:
     import bacommon.clienteffect as clfx
     import bacommon.clouddialog.basic as bcdlg
     from bascenev1lib.actor import spazappearance
+    from bascenev1lib.actor.spazbot import SpazBot
     from bauiv1lib.party import PartyWindow
 
     from baclassic._servermode import ServerController
@@ -93,6 +94,7 @@ class ClassicAppSubsystem(babase.AppSubsystem):
 
         # Server Mode.
         self.server: ServerController | None = None
+        self.activity_accounting = bascenev1.ActivityAccounting()
 
         self.log_have_new = False
         self.log_upload_timer_started = False
@@ -582,6 +584,36 @@ class ClassicAppSubsystem(babase.AppSubsystem):
 
         run_media_reload_benchmark()
 
+    def run_bot_benchmark(
+        self,
+        *,
+        bot_types: Sequence[type[SpazBot]] | None = None,
+        bot_count: int = 16,
+        dummy_count: int = 0,
+        duration: float = 60.0,
+        seed: int = 1,
+    ) -> None:
+        """Kick off a benchmark measuring the cost of bot AI."""
+        from baclassic._benchmark import run_bot_benchmark
+
+        run_bot_benchmark(
+            bot_types=bot_types,
+            bot_count=bot_count,
+            dummy_count=dummy_count,
+            duration=duration,
+            seed=seed,
+        )
+
+    def run_bot_pool_benchmark(
+        self, *, wave_count: int = 8, wave_size: int = 20, seed: int = 1
+    ) -> None:
+        """Kick off a benchmark comparing bot spawning with/without pools."""
+        from baclassic._benchmark import run_bot_pool_benchmark
+
+        run_bot_pool_benchmark(
+            wave_count=wave_count, wave_size=wave_size, seed=seed
+        )
+
     def run_stress_test(
         self,
         *,
@@ -0,0 +1,280 @@
+# Released under the MIT License. See LICENSE for details.
+#
+"""Persistent ban functionality for servers."""
+from __future__ import annotations
+
+import os
+import time
+import logging
+from threading import Lock
+
+from efro.dataclassio import dataclass_from_json, dataclass_to_json
+from bacommon.servermanager import BanEntry, BanList
+
+import babase
+import bascenev1
+
+
+class BanRegistry:
+    """Persistent registry of banned accounts and clients.
+
+    Bans are keyed by v1 account id and/or client spec string and are
+    held in hash indexes, so checking a joining player is O(1). Bans
+    with different keys can overlap (an account can be banned on its
+    own and also as part of a ban on a spec); the longest-lasting one
+    applies. They are stored in a json file and saved in the background
+    after any change.
+
+    Expired bans are pruned by a :class:`~bascenev1.TimingWheel`
+    running on the wall clock, so we never scan the whole registry.
+    Lookups also check expiry themselves, so a ban never outlives its
+    expire time even if it hasn't been pruned yet.
+    """
+
+    # Resolution of our timing wheel in seconds (and how often we
+    # prune).
+    SLOT_SECONDS = 60.0
+
+    # How long we wait after a change before saving (so bursts of
+    # changes result in a single save).
+    SAVE_DELAY = 1.0
+
+    def __init__(self, path: str) -> None:
+        self._path = path
+        self._entries: dict[tuple[str | None, str | None], BanEntry] = {}
+        self._by_account: dict[str, dict[int, BanEntry]] = {}
+        self._by_spec: dict[str, dict[int, BanEntry]] = {}
+        self._expiry: bascenev1.TimingWheel[int, BanEntry] = (
+            bascenev1.TimingWheel(
+                self.SLOT_SECONDS, on_expire=self._on_expired, clock=time.time
+            )
+        )
+        self._save_timer: babase.AppTimer | None = None
+        self._dirty = False
+        self._save_lock = Lock()
+        self._save_generation = 0
+        self._saved_generation = 0
+        self._load()
+
+    @property
+    def has_entries(self) -> bool:
+        """Whether there are any bans at all (they may be expired)."""
+        return bool(self._entries)
+
+    def get_ban(
+        self, account_id: str | None, spec: str | None
+    ) -> BanEntry | None:
+        """Return the ban covering an account id or spec, if any.
+
+        If several do, the longest-lasting one is returned.
+        """
+        best: BanEntry | None = None
+        best_expire_time = time.time()
+        for index, key in (
+            (self._by_account, account_id),
+            (self._by_spec, spec),
+        ):
+            if key is None:
+                continue
+            for entry in index.get(key, {}).values():
+                if entry.expire_time is None:
+                    return entry
+                if entry.expire_time > best_expire_time:
+                    best = entry
+                    best_expire_time = entry.expire_time
+        return best
+
+    def ban(
+        self,
+        account_id: str | None = None,
+        spec: str | None = None,
+        duration: float | None = None,
+        reason: str = '',
+    ) -> BanEntry:
+        """Ban an account id and/or spec.
+
+        duration is in seconds; None bans permanently. An existing ban
+        on exactly the same account id and spec is replaced unless it
+        would outlast the new one (in which case it is kept and
+        returned); unban first to shorten a ban. Other bans covering the
+        account id or spec are left alone.
+        """
+        if account_id is None and spec is None:
+            raise ValueError('An account_id or spec is required.')
+        now = time.time()
+        entry = BanEntry(
+            account_id=account_id,
+            spec=spec,
+            expire_time=None if duration is None else now + duration,
+            reason=reason,
+            create_time=now,
+        )
+        entry = self._add(entry)
+        self._mark_dirty()
+        return entry
+
+    def unban(
+        self, account_id: str | None = None, spec: str | None = None
+    ) -> bool:
+        """Remove bans on an account id and/or spec.
+
+        Returns whether anything was removed.
+        """
+        removed = False
+        for index, key in (
+            (self._by_account, account_id),
+            (self._by_spec, spec),
+        ):
+            if key is None:
+                continue
+            for entry in list(index.get(key, {}).values()):
+                self._remove(entry)
+                removed = True
+        if removed:
+            self._mark_dirty()
+        return removed
+
+    def import_entries(
+        self, entries: list[BanEntry], replace: bool = False
+    ) -> None:
+        """Add a batch of bans in one go (resulting in a single save).
+
+        If replace is True, all existing bans are removed first.
+        """
+        if replace:
+            self._entries.clear()
+            self._by_account.clear()
+            self._by_spec.clear()
+            self._expiry.clear()
+        now = time.time()
+        for entry in entries:
+            if entry.account_id is None and entry.spec is None:
+                continue
+            if entry.expire_time is not None and entry.expire_time <= now:
+                continue
+            self._add(entry)
+        self._mark_dirty()
+
+    def export_entries(self) -> list[BanEntry]:
+        """Return all current bans."""
+        now = time.time()
+        return [
+            entry
+            for entry in self._entries.values()
+            if entry.expire_time is None or entry.expire_time > now
+        ]
+
+    def import_file(self, path: str, replace: bool = False) -> None:
+        """Import bans from a json file written by export_file()."""
+        with open(path, encoding='utf-8') as infile:
+            banlist = dataclass_from_json(BanList, infile.read())
+        self.import_entries(banlist.entries, replace=replace)
+
+    def export_file(self, path: str) -> None:
+        """Write all current bans to a json file."""
+        with open(path, 'w', encoding='utf-8') as outfile:
+            outfile.write(
+                dataclass_to_json(BanList(entries=self.export_entries()))
+            )
+
+    def _add(self, entry: BanEntry) -> BanEntry:
+        """Add an entry, returning whichever entry ends up in effect."""
+        existing = self._entries.get((entry.account_id, entry.spec))
+        if existing is not None:
+            if existing.expire_time is None or (
+                entry.expire_time is not None
+                and existing.expire_time >= entry.expire_time
+            ):
+                return existing
+            self._remove(existing)
+        self._entries[(entry.account_id, entry.spec)] = entry
+        for index, key in (
+            (self._by_account, entry.account_id),
+            (self._by_spec, entry.spec),
+        ):
+            if key is not None:
+                index.setdefault(key, {})[id(entry)] = entry
+        if entry.expire_time is not None:
+            self._expiry.add(id(entry), entry.expire_time - time.time(), entry)
+        return entry
+
+    def _remove(self, entry: BanEntry) -> None:
+        self._expiry.cancel(id(entry))
+        if self._entries.get((entry.account_id, entry.spec)) is entry:
+            del self._entries[(entry.account_id, entry.spec)]
+        for index, key in (
+            (self._by_account, entry.account_id),
+            (self._by_spec, entry.spec),
+        ):
+            if key is None:
+                continue
+            entries = index.get(key)
+            if entries is not None and entries.pop(id(entry), None):
+                if not entries:
+                    del index[key]
+
+    def _on_expired(self, _key: int, entry: BanEntry) -> None:
+        self._remove(entry)
+        self._mark_dirty()
+
+    def _load(self) -> None:
+        if not os.path.exists(self._path):
+            return
+        try:
+            with open(self._path, encoding='utf-8') as infile:
+                banlist = dataclass_from_json(BanList, infile.read())
+        except Exception:
+            logging.exception('Error loading bans from %s.', self._path)
+            return
+        now = time.time()
+        for entry in banlist.entries:
+            if entry.expire_time is None or entry.expire_time > now:
+                self._add(entry)
+
+    def save_now(self) -> None:
+        """Write any unsaved changes immediately (blocking).
+
+        Should be called as the server shuts down so recent bans aren't
+        lost along with a pending background save.
+        """
+        if not self._dirty:
+            return
+        self._save_timer = None
+        self._dirty = False
+        self._save_generation += 1
+        self._write(self.export_entries(), self._save_generation)
+
+    def _mark_dirty(self) -> None:
+        self._dirty = True
+        if self._save_timer is not None:
+            return
+        with babase.ContextRef.empty():
+            self._save_timer = babase.AppTimer(self.SAVE_DELAY, self._save)
+
+    def _save(self) -> None:
+        self._save_timer = None
+        if not self._dirty:
+            return
+        self._dirty = False
+
+        # Grab our entries here but do the actual encoding and writing
+        # in the background so big ban lists don't cause hitches.
+        self._save_generation += 1
+        babase.app.threadpool.submit_no_wait(
+            self._write, self.export_entries(), self._save_generation
+        )
+
+    def _write(self, entries: list[BanEntry], generation: int) -> None:
+        with self._save_lock:
+            # If a newer save beat us here, don't clobber it.
+            if generation < self._saved_generation:
+                return
+            try:
+                tmppath = f'{self._path}.tmp'
+                with open(tmppath, 'w', encoding='utf-8') as outfile:
+                    outfile.write(dataclass_to_json(BanList(entries=entries)))
+                os.replace(tmppath, self._path)
+            except Exception:
+                logging.exception('Error saving bans to %s.', self._path)
+                return
+            self._saved_generation = generation
@@ -3,27 +3,64 @@
 """Functionality related to running the game in server-mode."""
 from __future__ import annotations
 
+import os
 import sys
+import copy
 import time
+import bisect
+import weakref
 import logging
 from typing import TYPE_CHECKING
 
 from efro.terminal import Clr
 from bacommon.servermanager import (
     ServerCommand,
+    ServerCommandResponse,
+    CommandAckResponse,
+    CommandErrorResponse,
     StartServerModeCommand,
     ShutdownCommand,
     ShutdownReason,
     ChatMessageCommand,
     ScreenMessageCommand,
     ClientListCommand,
+    ClientListResponse,
+    ClientInfo,
     KickCommand,
+    ExecCommand,
+    UpdateConfigCommand,
+    BatchCommand,
+    BatchResponse,
+    MetricsCommand,
+    MetricsResponse,
+    ServerMetrics,
+    GamePortCommand,
+    GamePortResponse,
+    RosterCommand,
+    RosterResponse,
+    BanCommand,
+    UnbanCommand,
+    BanListCommand,
+    BanListResponse,
+    ImportBansCommand,
+    ActivityReportsCommand,
+    ActivityReportsResponse,
+    TopStatsCommand,
+    TopStatsResponse,
+    PlayerStatsCommand,
+    PlayerStatsResponse,
+    client_list_str,
+    LIVE_CONFIG_FIELDS,
+    STACK_DUMP_FILE_NAME,
 )
 import babase
 import bascenev1
 
+from baclassic._bans import BanRegistry
+from baclassic._statsstore import StatsStore, PlayerGameResult
+
 if TYPE_CHECKING:
-    from typing import Any
+    from typing import Any, Collection, TextIO
 
     from bacommon.servermanager import ServerConfig
 
@@ -32,27 +69,66 @@ def _cmd(command_data: bytes) -> None:
     """Handle commands coming in from our server manager parent process."""
     import pickle
 
-    assert babase.app.classic is not None
-
     command = pickle.loads(command_data)
     assert isinstance(command, ServerCommand)
 
+    # Commands coming through stdin have nowhere to send a response, so
+    # we print the interesting ones.
+    response = _handle_command(command)
+    if isinstance(response, ClientListResponse):
+        print(client_list_str(response.clients))
+    elif isinstance(response, CommandErrorResponse):
+        print(
+            f'{Clr.SRED}ERROR: server command {type(command).__name__}'
+            f' failed: {response.error}{Clr.RST}'
+        )
+
+
+def _handle_command(command: ServerCommand) -> ServerCommandResponse:
+    """Run a command from our parent process and return a response."""
+    try:
+        return _run_command(command)
+    except Exception as exc:
+        logging.exception('Error running server command %s.', command)
+        return CommandErrorResponse(error=str(exc))
+
+
+def _run_command(command: ServerCommand) -> ServerCommandResponse:
+    # pylint: disable=too-many-return-statements
+    assert babase.app.classic is not None
+
     if isinstance(command, StartServerModeCommand):
         assert babase.app.classic.server is None
-        babase.app.classic.server = ServerController(command.config)
-        return
+        babase.app.classic.server = ServerController(
+            command.config, data_dir=command.data_dir
+        )
+        if command.command_socket_path is not None:
+            _ServerCommandChannel(command.command_socket_path)
+        return CommandAckResponse()
+
+    if isinstance(command, BatchCommand):
+        return BatchResponse(
+            responses=[_handle_command(cmd) for cmd in command.commands]
+        )
+
+    if isinstance(command, ExecCommand):
+        import __main__
+
+        # pylint: disable=exec-used
+        exec(command.statement, __main__.__dict__)
+        return CommandAckResponse()
 
     if isinstance(command, ShutdownCommand):
         assert babase.app.classic.server is not None
         babase.app.classic.server.shutdown(
             reason=command.reason, immediate=command.immediate
         )
-        return
+        return CommandAckResponse()
 
     if isinstance(command, ChatMessageCommand):
         assert babase.app.classic.server is not None
         bascenev1.chatmessage(command.message, clients=command.clients)
-        return
+        return CommandAckResponse()
 
     if isinstance(command, ScreenMessageCommand):
         assert babase.app.classic.server is not None
@@ -66,30 +142,285 @@ def _cmd(command_data: bytes) -> None:
             clients=command.clients,
             transient=command.clients is not None,
         )
-        return
+        return CommandAckResponse()
 
     if isinstance(command, ClientListCommand):
         assert babase.app.classic.server is not None
-        babase.app.classic.server.print_client_list()
-        return
+        return ClientListResponse(
+            clients=babase.app.classic.server.get_client_list()
+        )
 
     if isinstance(command, KickCommand):
         assert babase.app.classic.server is not None
         babase.app.classic.server.kick(
             client_id=command.client_id, ban_time=command.ban_time
         )
-        return
+        return CommandAckResponse()
+
+    if isinstance(command, UpdateConfigCommand):
+        assert babase.app.classic.server is not None
+        babase.app.classic.server.update_config(command.values)
+        return CommandAckResponse()
+
+    if isinstance(command, RosterCommand):
+        assert babase.app.classic.server is not None
+        return babase.app.classic.server.get_roster(
+            command.since_version, command.roster_id
+        )
+
+    if isinstance(command, BanCommand):
+        assert babase.app.classic.server is not None
+        babase.app.classic.server.bans.ban(
+            account_id=command.account_id,
+            spec=command.spec,
+            duration=command.duration,
+            reason=command.reason,
+        )
+        return CommandAckResponse()
+
+    if isinstance(command, UnbanCommand):
+        assert babase.app.classic.server is not None
+        babase.app.classic.server.bans.unban(
+            account_id=command.account_id, spec=command.spec
+        )
+        return CommandAckResponse()
 
-    print(
-        f'{Clr.SRED}ERROR: server process'
-        f' got unknown command: {type(command)}{Clr.RST}'
+    if isinstance(command, BanListCommand):
+        assert babase.app.classic.server is not None
+        return BanListResponse(
+            entries=babase.app.classic.server.bans.export_entries()
+        )
+
+    if isinstance(command, ImportBansCommand):
+        assert babase.app.classic.server is not None
+        babase.app.classic.server.bans.import_entries(
+            command.entries, replace=command.replace
+        )
+        return CommandAckResponse()
+
+    if isinstance(command, MetricsCommand):
+        assert babase.app.classic.server is not None
+        return MetricsResponse(metrics=babase.app.classic.server.get_metrics())
+
+    if isinstance(command, GamePortCommand):
+        assert babase.app.classic.server is not None
+        return GamePortResponse(port=bascenev1.get_game_port())
+
+    if isinstance(command, TopStatsCommand):
+        assert babase.app.classic.server is not None
+        stats = babase.app.classic.server.stats
+        if stats is None:
+            raise RuntimeError('Persistent stats are not enabled.')
+        return TopStatsResponse(
+            entries=stats.get_top(command.count, order=command.order)
+        )
+
+    if isinstance(command, PlayerStatsCommand):
+        assert babase.app.classic.server is not None
+        stats = babase.app.classic.server.stats
+        if stats is None:
+            raise RuntimeError('Persistent stats are not enabled.')
+        return PlayerStatsResponse(stats=stats.get_player(command.account_id))
+
+    if isinstance(command, ActivityReportsCommand):
+        return ActivityReportsResponse(
+            reports=babase.app.classic.activity_accounting.get_reports()
+        )
+
+    return CommandErrorResponse(
+        error=f'Unknown command type: {type(command).__name__}'
     )
 
 
+class _ServerCommandChannel:
+    """Two-way command channel to our server manager parent process.
+
+    Connects to a unix domain socket our parent is listening on and
+    handles commands arriving over it, sending back responses. We
+    reconnect if the connection drops for any reason.
+    """
+
+    # How long to wait before attempting to reconnect.
+    RECONNECT_DELAY = 1.0
+
+    def __init__(self, socket_path: str) -> None:
+        self._socket_path = socket_path
+        babase.app.create_async_task(self._run(), name='server command channel')
+
+    async def _run(self) -> None:
+        import asyncio
+
+        from efro.rpc import RPCEndpoint
+
+        while True:
+            try:
+                reader, writer = await asyncio.open_unix_connection(
+                    self._socket_path
+                )
+                endpoint = RPCEndpoint(
+                    self._handle_raw_message,
+                    reader,
+                    writer,
+                    'server command channel',
+                )
+                await endpoint.run()
+            except Exception:
+                logging.exception('Error in server command channel.')
+            await asyncio.sleep(self.RECONNECT_DELAY)
+
+    async def _handle_raw_message(self, message: bytes) -> bytes:
+        import pickle
+
+        command = pickle.loads(message)
+        if not isinstance(command, ServerCommand):
+            response: ServerCommandResponse = CommandErrorResponse(
+                error=f'Expected a ServerCommand; got {type(command)}.'
+            )
+        else:
+            response = _handle_command(command)
+        return pickle.dumps(response)
+
+
+class _ClientRoster:
+    """Cached, versioned info about the clients connected to us.
+
+    Client spec strings only get parsed when a client joins or its spec
+    changes, and every change bumps our version so that callers can ask
+    for just the changes since a version they've already seen.
+    """
+
+    # How many changes we remember for answering diff queries; callers
+    # further behind than this get the full roster.
+    MAX_CHANGES = 1000
+
+    def __init__(self) -> None:
+        import uuid
+
+        self._roster_id = uuid.uuid4().hex
+        self._version = 0
+        self._clients: dict[int, ClientInfo] = {}
+        self._specs: dict[int, str] = {}
+
+        # Versions and the client ids they changed (in order).
+        self._changes: list[tuple[int, int]] = []
+
+        # The oldest version we can still produce diffs from.
+        self._min_diff_version = 0
+
+    @property
+    def clients(self) -> list[ClientInfo]:
+        """Info for all current clients."""
+        return list(self._clients.values())
+
+    def get_spec(self, client_id: int) -> str | None:
+        """Return the cached spec string for a client (None if unknown).
+
+        This does not update the roster, so clients which joined since
+        the last update() won't be found.
+        """
+        return self._specs.get(client_id)
+
+    def update(self) -> None:
+        """Bring ourself up to date with the game roster."""
+        import json
+
+        now = time.time()
+        seen: set[int] = set()
+        for client in bascenev1.get_game_roster():
+            client_id = client['client_id']
+            if client_id == -1:
+                continue
+            seen.add(client_id)
+            players = [p['name'] for p in client['players']]
+            spec = client['spec_string']
+            existing = self._clients.get(client_id)
+            if existing is None or self._specs[client_id] != spec:
+                self._specs[client_id] = spec
+                self._clients[client_id] = ClientInfo(
+                    client_id=client_id,
+                    account_name=json.loads(spec)['n'],
+                    players=players,
+                    join_time=(now if existing is None else existing.join_time),
+                )
+            elif existing.players != players:
+                self._clients[client_id] = copy.copy(existing)
+                self._clients[client_id].players = players
+            else:
+                continue
+            self._note_change(client_id)
+
+        for client_id in [c for c in self._clients if c not in seen]:
+            del self._clients[client_id]
+            del self._specs[client_id]
+            self._note_change(client_id)
+
+    def get(
+        self, since_version: int | None, roster_id: str | None
+    ) -> RosterResponse:
+        """Return our roster or the changes to it since a version."""
+        if (
+            since_version is None
+            or roster_id != self._roster_id
+            or not self._min_diff_version <= since_version <= self._version
+        ):
+            return RosterResponse(
+                version=self._version,
+                roster_id=self._roster_id,
+                full=True,
+                clients=self.clients,
+                removed=[],
+            )
+
+        # Our change list is sorted by version, so we only need to look
+        # at its tail.
+        start = bisect.bisect_right(
+            self._changes, since_version, key=lambda change: change[0]
+        )
+        changed = dict.fromkeys(
+            client_id for _version, client_id in self._changes[start:]
+        )
+        return RosterResponse(
+            version=self._version,
+            roster_id=self._roster_id,
+            full=False,
+            clients=[
+                self._clients[client_id]
+                for client_id in changed
+                if client_id in self._clients
+            ],
+            removed=[
+                client_id
+                for client_id in changed
+                if client_id not in self._clients
+            ],
+        )
+
+    def _note_change(self, client_id: int) -> None:
+        self._version += 1
+        self._changes.append((self._version, client_id))
+        if len(self._changes) > self.MAX_CHANGES:
+            dropped = self._changes[: -self.MAX_CHANGES]
+            del self._changes[: -self.MAX_CHANGES]
+            self._min_diff_version = dropped[-1][0]
+
+
 class ServerController:
     """Overall controller for the app in server mode."""
 
-    def __init__(self, config: ServerConfig) -> None:
+    # How often our metrics timer fires, and how many of its ticks go
+    # into each metrics sample.
+    METRICS_TICK_INTERVAL = 0.1
+    METRICS_SAMPLE_TICKS = 10
+
+    # Metrics tick interval while idle (we sample on every tick then).
+    IDLE_METRICS_TICK_INTERVAL = 1.0
+
+    # How often we check whether we should enter or leave idle mode.
+    IDLE_CHECK_INTERVAL = 1.0
+
+    def __init__(
+        self, config: ServerConfig, data_dir: str | None = None
+    ) -> None:
         self._config = config
         self._playlist_name = '__default__'
         self._ran_access_check = False
@@ -99,6 +430,39 @@ class ServerController:
         self._first_run = True
         self._shutdown_reason: ShutdownReason | None = None
         self._executing_shutdown = False
+        self._applied_log_levels = dict(self._config.log_levels or {})
+        self._roster = _ClientRoster()
+
+        # Where we keep persistent data such as bans and stats.
+        if data_dir is None:
+            data_dir = os.path.dirname(babase.app.env.config_file_path)
+
+        #: Persistent bans for the server; these are checked whenever a
+        #: player asks to join.
+        self.bans = BanRegistry(os.path.join(data_dir, 'bans.json'))
+
+        #: Persistent per-account stats (if enabled and available).
+        self.stats: StatsStore | None = None
+        if self._config.persistent_stats:
+            try:
+                self.stats = StatsStore(os.path.join(data_dir, 'stats.sqlite'))
+            except ImportError:
+                logging.warning(
+                    'sqlite3 is not available; persistent stats disabled.'
+                )
+
+        self._metrics: ServerMetrics | None = None
+        self._metrics_timer: babase.AppTimer | None = None
+        self._metrics_tick_interval = self.METRICS_TICK_INTERVAL
+        self._metrics_tick_time = time.monotonic()
+        self._metrics_tick_count = 0
+        self._metrics_lag_total = 0.0
+        self._metrics_lag_max = 0.0
+
+        # Idle mode (see idle_pause_seconds in our config).
+        self._idle = False
+        self._idle_since = time.monotonic()
+        self._idle_activity: weakref.ref[bascenev1.Activity] | None = None
 
         # Make note if they want us to import a playlist; we'll need to
         # do that first if so.
@@ -107,6 +471,18 @@ class ServerController:
         self._playlist_fetch_got_response = False
         self._playlist_fetch_code = -1
 
+        # If we were launched as a warm standby, the previous server
+        # process was still holding our port when we came up, so the
+        # engine will have bound some other one. It should be free now
+        # so ask for it again.
+        if bascenev1.get_game_port() != self._config.port:
+            self._rebind_game_port()
+
+        # Let our server manager grab our stack traces if it needs to
+        # kill us (this works even if we're hung).
+        self._stack_dump_file: TextIO | None = None
+        self._enable_stack_dumps()
+
         # Now sit around doing any pre-launch prep such as waiting for
         # account sign-in or fetching playlists; this will kick off the
         # session once done.
@@ -115,30 +491,40 @@ class ServerController:
                 0.25, self._prepare_to_serve, repeat=True
             )
 
+            # Health metrics are sampled in the background so fetching
+            # them is always cheap.
+            self._set_metrics_tick_interval(self.METRICS_TICK_INTERVAL)
+
+            self._idle_timer = babase.AppTimer(
+                self.IDLE_CHECK_INTERVAL, self._idle_check, repeat=True
+            )
+
+    def get_client_list(self) -> list[ClientInfo]:
+        """Return info about all connected clients."""
+        self._roster.update()
+        return self._roster.clients
+
+    def get_roster(
+        self, since_version: int | None = None, roster_id: str | None = None
+    ) -> RosterResponse:
+        """Return the client roster, or changes to it since a version.
+
+        Pass the version and roster_id from an earlier response to get
+        only clients that joined, changed, or left since then.
+        """
+        self._roster.update()
+        return self._roster.get(since_version, roster_id)
+
+    def get_metrics(self) -> ServerMetrics | None:
+        """Return our most recently sampled health metrics.
+
+        Returns None if we have not taken a sample yet.
+        """
+        return self._metrics
+
     def print_client_list(self) -> None:
         """Print info about all connected clients."""
-        import json
-
-        roster = bascenev1.get_game_roster()
-        title1 = 'Client ID'
-        title2 = 'Account Name'
-        title3 = 'Players'
-        col1 = 10
-        col2 = 16
-        out = (
-            f'{Clr.BLD}'
-            f'{title1:<{col1}} {title2:<{col2}} {title3}'
-            f'{Clr.RST}'
-        )
-        for client in roster:
-            if client['client_id'] == -1:
-                continue
-            spec = json.loads(client['spec_string'])
-            name = spec['n']
-            players = ', '.join(n['name'] for n in client['players'])
-            clientid = client['client_id']
-            out += f'\n{clientid:<{col1}} {name:<{col2}} {players}'
-        print(out)
+        print(client_list_str(self.get_client_list()))
 
     def kick(self, client_id: int, ban_time: int | None) -> None:
         """Kick the provided client id.
@@ -152,8 +538,204 @@ class ServerController:
         if ban_time is None:
             ban_time = 300
 
+        # Record bans persistently so they survive restarts.
+        if ban_time > 0:
+            account_id, spec = self._get_client_identity(client_id)
+            if account_id is not None or spec is not None:
+                self.bans.ban(
+                    account_id=account_id,
+                    spec=spec,
+                    duration=ban_time,
+                    reason='kicked',
+                )
+
         bascenev1.disconnect_client(client_id=client_id, ban_time=ban_time)
 
+    def reject_if_banned(self, player: bascenev1.SessionPlayer) -> bool:
+        """Kick a player's client if it is banned; return whether it was.
+
+        This is called by sessions as players ask to join.
+        """
+        if not self.bans.has_entries:
+            return False
+        client_id = player.inputdevice.client_id
+
+        # The host can't be banned.
+        if client_id == -1:
+            return False
+
+        # Our roster gets updated regularly as metrics are sampled, so
+        # we should only need to look up clients that just connected.
+        spec = self._roster.get_spec(client_id)
+        if spec is None:
+            spec = self._get_client_identity(client_id)[1]
+        ban = self.bans.get_ban(
+            account_id=player.get_v1_account_id(), spec=spec
+        )
+        if ban is None:
+            return False
+        remaining = (
+            None if ban.expire_time is None else ban.expire_time - time.time()
+        )
+        logging.info(
+            'Rejecting banned client %d (%s; %s).',
+            client_id,
+            ban.reason or 'no reason given',
+            (
+                'permanent'
+                if remaining is None
+                else f'{remaining / 60.0:.1f} minutes left'
+            ),
+        )
+        bascenev1.disconnect_client(
+            client_id=client_id,
+            ban_time=300 if remaining is None else min(300, int(remaining)),
+        )
+        return True
+
+    def record_game_results(
+        self, activity: bascenev1.Activity, results: bascenev1.GameResults
+    ) -> None:
+        """Record a finished game in our persistent stats (if enabled).
+
+        This is called by sessions as games end.
+        """
+        if self.stats is None:
+            return
+        winners = results.winnergroups
+        winning_teams = winners[0].teams if winners else []
+        entries: list[PlayerGameResult] = []
+
+        # These are per-game; sessions reset them as each game begins.
+        for account in activity.session.stats.get_account_stats():
+            sessionteam = (
+                None if account.sessionteam is None else account.sessionteam()
+            )
+            won = sessionteam is not None and sessionteam in winning_teams
+            entries.append(
+                PlayerGameResult(
+                    account_id=account.account_id,
+                    name=account.name,
+                    score=account.score,
+                    kills=account.kills,
+                    deaths=account.deaths,
+                    won=won,
+                )
+            )
+        cls = type(activity)
+        self.stats.record_game(f'{cls.__module__}.{cls.__qualname__}', entries)
+
+    def _get_client_identity(
+        self, client_id: int
+    ) -> tuple[str | None, str | None]:
+        """Return the account id and spec string for a client."""
+        for client in bascenev1.get_game_roster():
+            if client['client_id'] == client_id:
+                return client.get('account_id'), client['spec_string']
+        return None, None
+
+    def update_config(self, values: dict[str, Any]) -> None:
+        """Apply new values for config fields while running.
+
+        Only fields in bacommon.servermanager.LIVE_CONFIG_FIELDS can be
+        updated this way; others require a restart.
+        """
+        from efro.dataclassio import dataclass_validate
+
+        for name in values:
+            if name not in LIVE_CONFIG_FIELDS:
+                raise ValueError(f"Config field '{name}' can't be set live.")
+
+        # Validate everything before we touch our actual config.
+        newconfig = copy.copy(self._config)
+        for name, value in values.items():
+            setattr(newconfig, name, value)
+        dataclass_validate(newconfig)
+        self._config = newconfig
+
+        # If we haven't launched our session yet, all values will get
+        # applied when we do.
+        if self._prep_timer is not None:
+            return
+
+        self._apply_live_config(values.keys())
+        namesstr = ', '.join(sorted(values))
+        print(f'{Clr.SBLU}Applied server config changes: {namesstr}.{Clr.RST}')
+
+    def _apply_live_config(self, names: Collection[str] | None) -> None:
+        """Push live-updatable config values to the engine.
+
+        If names is provided, only those fields are pushed.
+        """
+        # pylint: disable=too-many-branches
+        config = self._config
+
+        def _want(name: str) -> bool:
+            return names is None or name in names
+
+        if _want('authenticate_clients'):
+            bascenev1.set_authenticate_clients(config.authenticate_clients)
+        if _want('enable_default_kick_voting'):
+            bascenev1.set_enable_default_kick_voting(
+                config.enable_default_kick_voting
+            )
+        if _want('admins'):
+            bascenev1.set_admins(config.admins)
+
+        # Call set-enabled last (will push state to the cloud).
+        if _want('max_party_size'):
+            bascenev1.set_public_party_max_size(config.max_party_size)
+        if _want('enable_queue'):
+            bascenev1.set_public_party_queue_enabled(config.enable_queue)
+        if _want('party_name'):
+            bascenev1.set_public_party_name(config.party_name)
+        if _want('stats_url'):
+            bascenev1.set_public_party_stats_url(config.stats_url)
+        if _want('public_ipv4_address'):
+            bascenev1.set_public_party_public_address_ipv4(
+                config.public_ipv4_address
+            )
+        if _want('public_ipv6_address'):
+            bascenev1.set_public_party_public_address_ipv6(
+                config.public_ipv6_address
+            )
+        if _want('party_is_public'):
+            bascenev1.set_public_party_enabled(config.party_is_public)
+
+        if _want('player_rejoin_cooldown'):
+            bascenev1.set_player_rejoin_cooldown(config.player_rejoin_cooldown)
+        if _want('session_max_players_override'):
+            bascenev1.set_max_players_override(
+                config.session_max_players_override
+            )
+
+        if _want('activity_accounting'):
+            assert babase.app.classic is not None
+            babase.app.classic.activity_accounting.set_enabled(
+                config.activity_accounting
+            )
+
+        # Log levels get passed to the engine through its config file
+        # at launch, so we only need to handle them when they change.
+        if names is not None and 'log_levels' in names:
+            self._apply_log_levels()
+
+    def _apply_log_levels(self) -> None:
+        from bacommon.logging import get_base_logger_control_config_client
+
+        levels = self._config.log_levels or {}
+        base_levels = get_base_logger_control_config_client().levels
+        for name in set(self._applied_log_levels) - set(levels):
+            logging.getLogger(name).setLevel(
+                base_levels.get(name, logging.NOTSET)
+            )
+        for name, level in levels.items():
+            logging.getLogger(name).setLevel(logging.getLevelName(level))
+        self._applied_log_levels = dict(levels)
+
+        # Let the native layer know that levels changed.
+        babase.update_internal_logger_levels()
+
     def shutdown(self, reason: ShutdownReason, immediate: bool) -> None:
         """Set the app to quit either now or at the next clean opportunity."""
         self._shutdown_reason = reason
@@ -184,6 +766,9 @@ class ServerController:
         if self._executing_shutdown:
             return
         self._executing_shutdown = True
+
+        # Don't lose bans still waiting to be saved in the background.
+        self.bans.save_now()
         timestrval = time.strftime('%c')
         if self._shutdown_reason is ShutdownReason.RESTARTING:
             bascenev1.broadcastmessage(
@@ -206,6 +791,168 @@ class ServerController:
         with babase.ContextRef.empty():
             babase.apptimer(2.0, babase.quit)
 
+    def _idle_check(self) -> None:
+        now = time.monotonic()
+        timeout = self._config.idle_pause_seconds
+        if (
+            timeout is None
+            or self._prep_timer is not None
+            or bascenev1.have_connected_clients()
+        ):
+            self._idle_since = now
+            if self._idle:
+                self._exit_idle()
+            return
+        if not self._idle and now - self._idle_since >= timeout:
+            self._enter_idle()
+        if self._idle:
+            # Activities can change while we're idle (score screens
+            # don't allow pausing, for instance), so keep checking.
+            self._pause_for_idle()
+
+    def _enter_idle(self) -> None:
+        logging.info('No clients connected; entering idle mode.')
+        self._idle = True
+        self._set_metrics_tick_interval(self.IDLE_METRICS_TICK_INTERVAL)
+
+    def _exit_idle(self) -> None:
+        logging.info('Client connected; leaving idle mode.')
+        self._idle = False
+        activity = (
+            None if self._idle_activity is None else self._idle_activity()
+        )
+        self._idle_activity = None
+        if activity is not None and not activity.expired:
+            with activity.context:
+                activity.globalsnode.paused = False
+        self._set_metrics_tick_interval(self.METRICS_TICK_INTERVAL)
+
+    def _pause_for_idle(self) -> None:
+        activity = bascenev1.get_foreground_host_activity()
+        if (
+            activity is None
+            or activity.expired
+            or not activity.allow_pausing
+            or (
+                self._idle_activity is not None
+                and self._idle_activity() is activity
+            )
+        ):
+            return
+        with activity.context:
+            globs = activity.globalsnode
+
+            # Leave things alone if someone else paused it.
+            if globs.paused:
+                return
+            globs.paused = True
+        self._idle_activity = weakref.ref(activity)
+
+    def _set_metrics_tick_interval(self, interval: float) -> None:
+        self._metrics_tick_interval = interval
+        self._metrics_tick_time = time.monotonic()
+        self._metrics_tick_count = 0
+        self._metrics_lag_total = 0.0
+        self._metrics_lag_max = 0.0
+        with babase.ContextRef.empty():
+            self._metrics_timer = babase.AppTimer(
+                interval, self._metrics_tick, repeat=True
+            )
+
+    def _metrics_tick(self) -> None:
+        # Any time beyond our timer interval is time the logic thread
+        # spent busy with other things.
+        now = time.monotonic()
+        lag = max(
+            0.0, now - self._metrics_tick_time - self._metrics_tick_interval
+        )
+        self._metrics_tick_time = now
+        self._metrics_tick_count += 1
+        self._metrics_lag_total += lag
+        self._metrics_lag_max = max(self._metrics_lag_max, lag)
+
+        # Sample about once per second.
+        if (
+            self._metrics_tick_count * self._metrics_tick_interval
+            >= self.METRICS_SAMPLE_TICKS * self.METRICS_TICK_INTERVAL - 1e-6
+        ):
+            self._sample_metrics()
+
+    def _sample_metrics(self) -> None:
+        self._roster.update()
+        clients = self._roster.clients
+        activity = bascenev1.get_foreground_host_activity()
+        gcsubsys = babase.app.gc
+        prefetch = bascenev1.get_prefetch_counts()
+        effects = bascenev1.get_effect_counts()
+        self._metrics = ServerMetrics(
+            client_count=len(clients),
+            player_count=sum(len(client.players) for client in clients),
+            activity=None if activity is None else type(activity).__name__,
+            logic_lag_avg=self._metrics_lag_total / self._metrics_tick_count,
+            logic_lag_max=self._metrics_lag_max,
+            gc_pass_count=gcsubsys.collect_count,
+            gc_pass_seconds_total=gcsubsys.collect_duration_total,
+            gc_pass_seconds_last=gcsubsys.last_collect_duration,
+            gc_incremental_pass_count=gcsubsys.incremental_collect_count,
+            gc_incremental_pass_seconds_total=(
+                gcsubsys.incremental_collect_duration_total
+            ),
+            gc_pause_bounds=list(gcsubsys.PAUSE_BUCKETS),
+            gc_pause_counts=list(gcsubsys.pause_histogram),
+            prefetch_hits=prefetch.hits,
+            prefetch_misses=prefetch.misses,
+            effects_emitted=effects.emitted,
+            effects_suppressed=effects.suppressed,
+            idle=self._idle,
+        )
+        self._metrics_tick_count = 0
+        self._metrics_lag_total = 0.0
+        self._metrics_lag_max = 0.0
+
+    def _enable_stack_dumps(self) -> None:
+        """Dump Python stack traces to a file on SIGUSR1."""
+        # pylint: disable=consider-using-with
+        import signal
+        import faulthandler
+
+        if not hasattr(signal, 'SIGUSR1'):
+            return
+        path = os.path.join(
+            os.path.dirname(babase.app.env.config_file_path),
+            STACK_DUMP_FILE_NAME,
+        )
+        try:
+            # faulthandler writes to the raw file descriptor when the
+            # signal arrives, so we need to keep this open.
+            self._stack_dump_file = open(path, 'w', encoding='utf-8')
+            faulthandler.register(
+                signal.SIGUSR1, file=self._stack_dump_file, all_threads=True
+            )
+        except Exception:
+            logging.exception('Error enabling stack dumps.')
+
+    def _rebind_game_port(self) -> None:
+        """Ask the engine to switch to our configured port."""
+        appcfg = babase.app.config
+        appcfg['Port'] = self._config.port
+        appcfg.apply()
+
+        # Rebinding is best-effort; complain if it didn't take. Our
+        # server manager checks this via GamePortCommand and launches a
+        # fresh process in our place if so.
+        with babase.ContextRef.empty():
+            babase.apptimer(1.0, self._check_game_port)
+
+    def _check_game_port(self) -> None:
+        port = bascenev1.get_game_port()
+        if port != self._config.port:
+            logging.warning(
+                'Unable to bind requested port %d; hosting on port %d.',
+                self._config.port,
+                port,
+            )
+
     def _run_access_check(self) -> None:
         """Check with the master server to see if we're likely joinable."""
         assert babase.app.classic is not None
@@ -375,18 +1122,34 @@ class ServerController:
             else:
                 raise RuntimeError(f'Unknown session type {sessiontype}')
 
+            # Compile the playlist up front so problems show up at
+            # launch and the session finds it ready in the cache.
+            if sessiontype is not bascenev1.CoopSession:
+                if not bascenev1.compile_playlist(
+                    self._config.playlist_inline,
+                    sessiontype,
+                    name=self._playlist_name,
+                ):
+                    logging.error('Inline playlist contains no valid games.')
+
             # Need to add this in a transaction instead of just setting
             # it directly or it will get overwritten by the
-            # master-server.
-            plus.add_v1_account_transaction(
-                {
-                    'type': 'ADD_PLAYLIST',
-                    'playlistType': ptypename,
-                    'playlistName': self._playlist_name,
-                    'playlist': self._config.playlist_inline,
-                }
+            # master-server. If the master-server already gave us this
+            # exact playlist (from an earlier launch or run), there's no
+            # need to send it again.
+            existing = appcfg.get(f'{ptypename} Playlists', {}).get(
+                self._playlist_name
             )
-            plus.run_v1_account_transactions()
+            if existing != self._config.playlist_inline:
+                plus.add_v1_account_transaction(
+                    {
+                        'type': 'ADD_PLAYLIST',
+                        'playlistType': ptypename,
+                        'playlistName': self._playlist_name,
+                        'playlist': self._config.playlist_inline,
+                    }
+                )
+                plus.run_v1_account_transactions()
 
         if self._first_run:
             curtimestr = time.strftime('%c')
@@ -418,39 +1181,17 @@ class ServerController:
 
         appcfg['Teams Series Length'] = self._config.teams_series_length
         appcfg['FFA Series Length'] = self._config.ffa_series_length
+        bascenev1.set_playlist_scheduler(
+            self._config.playlist_scheduler,
+            self._config.playlist_no_repeat_window,
+            self._config.playlist_seed,
+        )
 
         # Deprecated; left here in order to not break mods.
         classic.teams_series_length = self._config.teams_series_length
         classic.ffa_series_length = self._config.ffa_series_length
 
-        bascenev1.set_authenticate_clients(self._config.authenticate_clients)
-
-        bascenev1.set_enable_default_kick_voting(
-            self._config.enable_default_kick_voting
-        )
-        bascenev1.set_admins(self._config.admins)
-
-        # Call set-enabled last (will push state to the cloud).
-        bascenev1.set_public_party_max_size(self._config.max_party_size)
-        bascenev1.set_public_party_queue_enabled(self._config.enable_queue)
-        bascenev1.set_public_party_name(self._config.party_name)
-        bascenev1.set_public_party_stats_url(self._config.stats_url)
-        bascenev1.set_public_party_public_address_ipv4(
-            self._config.public_ipv4_address
-        )
-        bascenev1.set_public_party_public_address_ipv6(
-            self._config.public_ipv6_address
-        )
-
-        bascenev1.set_public_party_enabled(self._config.party_is_public)
-
-        bascenev1.set_player_rejoin_cooldown(
-            self._config.player_rejoin_cooldown
-        )
-
-        bascenev1.set_max_players_override(
-            self._config.session_max_players_override
-        )
+        self._apply_live_config(names=None)
 
         # And here.. we.. go.
         if self._config.stress_test_players is not None:
@@ -0,0 +1,198 @@
+# Released under the MIT License. See LICENSE for details.
+#
+"""Memory and object-lifetime accounting for activities."""
+from __future__ import annotations
+
+import time
+import logging
+import weakref
+import tracemalloc
+from typing import TYPE_CHECKING
+
+from bacommon.servermanager import ActivityReport, AllocationSite
+import babase
+import _bascenev1
+
+if TYPE_CHECKING:
+    import bascenev1
+
+
+class ActivityAccounting:
+    """Keeps reports on the lifecycles of activities.
+
+    When enabled, Python's :mod:`tracemalloc` module is used to snapshot
+    allocations as each activity transitions in and again as it
+    expires; the difference between the two (calculated in the
+    background) shows where memory went while it ran. We also note
+    which actors and nodes are still around as it expires and whether
+    it actually gets freed afterwards.
+
+    Tracing allocations is expensive, so this is disabled by default.
+    Access the shared instance via ``babase.app.classic.activity_accounting``.
+    """
+
+    # How many reports we hold on to.
+    MAX_REPORTS = 50
+
+    # How many allocation sites we list per report.
+    TOP_SITE_COUNT = 10
+
+    # Frames stored per traced allocation. We only report the line an
+    # allocation happened on, so there's no need to pay for more.
+    TRACEBACK_FRAMES = 1
+
+    def __init__(self) -> None:
+        self._enabled = False
+        self._started_tracing = False
+        self._reports: list[ActivityReport] = []
+        self._activity_reports: weakref.WeakKeyDictionary[
+            bascenev1.Activity, ActivityReport
+        ] = weakref.WeakKeyDictionary()
+        self._begin_snapshots: weakref.WeakKeyDictionary[
+            bascenev1.Activity, tracemalloc.Snapshot
+        ] = weakref.WeakKeyDictionary()
+
+    @property
+    def enabled(self) -> bool:
+        """Whether activities are being accounted for."""
+        return self._enabled
+
+    def set_enabled(self, enabled: bool) -> None:
+        """Turn accounting on or off.
+
+        Activities already running when this is turned on won't be
+        covered.
+        """
+        if enabled == self._enabled:
+            return
+        self._enabled = enabled
+        if enabled:
+            if not tracemalloc.is_tracing():
+                tracemalloc.start(self.TRACEBACK_FRAMES)
+                self._started_tracing = True
+        else:
+            self._begin_snapshots.clear()
+            self._activity_reports.clear()
+            if self._started_tracing:
+                tracemalloc.stop()
+                self._started_tracing = False
+
+    def get_reports(self) -> list[ActivityReport]:
+        """Return reports on recent activities (oldest first)."""
+        return list(self._reports)
+
+    def activity_transitioned_in(self, activity: bascenev1.Activity) -> None:
+        """Called by an activity as it transitions in.
+
+        :meta private:
+        """
+        cls = type(activity)
+        report = ActivityReport(
+            activity=f'{cls.__module__}.{cls.__qualname__}',
+            begin_time=time.time(),
+        )
+        self._reports.append(report)
+        if len(self._reports) > self.MAX_REPORTS:
+            self._reports.pop(0)
+        self._activity_reports[activity] = report
+        weakref.finalize(activity, _mark_freed, report)
+        if tracemalloc.is_tracing():
+            self._begin_snapshots[activity] = _take_snapshot()
+
+    def activity_expiring(self, activity: bascenev1.Activity) -> None:
+        """Called by an activity just before it expires.
+
+        :meta private:
+        """
+        report = self._activity_reports.get(activity)
+        if report is None:
+            return
+        report.end_time = time.time()
+        report.actors = _count_actors(activity)
+        try:
+            with activity.context:
+                nodes = _bascenev1.getnodes()
+            counts: dict[str, int] = {}
+            for node in nodes:
+                nodetype = node.getnodetype()
+                counts[nodetype] = counts.get(nodetype, 0) + 1
+            report.nodes = counts
+        except Exception:
+            logging.exception('Error counting nodes for %s.', activity)
+
+        begin_snapshot = self._begin_snapshots.pop(activity, None)
+        if begin_snapshot is not None and tracemalloc.is_tracing():
+            # Comparing snapshots can take a while; do it in the bg.
+            babase.app.threadpool.submit_no_wait(
+                _compare_snapshots,
+                report,
+                begin_snapshot,
+                _take_snapshot(),
+                self.TOP_SITE_COUNT,
+            )
+
+    def activity_not_dying(
+        self, activity: bascenev1.Activity, warning_count: int
+    ) -> None:
+        """Called when an expired activity is found to still be alive.
+
+        :meta private:
+        """
+        report = self._activity_reports.get(activity)
+        if report is None:
+            return
+        report.stuck_warnings = warning_count
+        report.stuck_actors = _count_actors(activity)
+        logging.warning(
+            'Expired activity %s is still alive; live actors: %s;'
+            ' memory delta: %s; top allocation sites: %s',
+            report.activity,
+            report.stuck_actors or 'none',
+            report.memory_delta,
+            ', '.join(
+                f'{site.location} ({site.size_delta:+d})'
+                for site in report.top_sites
+            )
+            or 'unknown',
+        )
+
+
+def _mark_freed(report: ActivityReport) -> None:
+    report.freed = True
+
+
+def _count_actors(activity: bascenev1.Activity) -> dict[str, int]:
+    counts: dict[str, int] = {}
+    for cls, count in activity.get_actor_counts().items():
+        counts[cls.__name__] = counts.get(cls.__name__, 0) + count
+    return counts
+
+
+def _take_snapshot() -> tracemalloc.Snapshot:
+    # Leave out allocations made by tracemalloc itself.
+    return tracemalloc.take_snapshot().filter_traces(
+        [tracemalloc.Filter(False, tracemalloc.__file__)]
+    )
+
+
+def _compare_snapshots(
+    report: ActivityReport,
+    begin: tracemalloc.Snapshot,
+    end: tracemalloc.Snapshot,
+    top_site_count: int,
+) -> None:
+    """Fill in allocation info for a report (runs in a bg thread)."""
+    try:
+        stats = end.compare_to(begin, 'lineno')
+        report.top_sites = [
+            AllocationSite(
+                location=f'{stat.traceback[0].filename}'
+                f':{stat.traceback[0].lineno}',
+                size_delta=stat.size_diff,
+                count_delta=stat.count_diff,
+            )
+            for stat in stats[:top_site_count]
+        ]
+        report.memory_delta = sum(stat.size_diff for stat in stats)
+    except Exception:
+        logging.exception('Error comparing snapshots for %s.', report.activity)
@@ -0,0 +1,149 @@
+# Released under the MIT License. See LICENSE for details.
+#
+"""Functionality related to limiting particle effects."""
+from __future__ import annotations
+
+import copy
+import math
+from dataclasses import dataclass
+from typing import TYPE_CHECKING
+
+import babase
+
+import _bascenev1
+
+if TYPE_CHECKING:
+    from typing import Any, Sequence
+
+
+@dataclass
+class EffectCounts:
+    """Totals for effects passed through effect budgets."""
+
+    #: Emits which went through (possibly with reduced counts).
+    emitted: int = 0
+
+    #: Emits dropped because a matching one already went out at the
+    #: same spot in the same frame, or because the frame was full.
+    suppressed: int = 0
+
+    #: Particles requested by emits which went through.
+    particles_emitted: int = 0
+
+    #: Particles dropped, either with suppressed emits or by scaling
+    #: counts down under load.
+    particles_suppressed: int = 0
+
+
+_g_counts = EffectCounts()
+
+
+def get_effect_counts() -> EffectCounts:
+    """Return totals for effect budgets so far."""
+    return copy.copy(_g_counts)
+
+
+class EffectBudget:
+    """Limits the particle effects an activity emits.
+
+    Every effect emitted goes out to all clients, so chain reactions of
+    bombs can flood them. Emits made through :meth:`emitfx()` that
+    match one already made near the same position in the same frame
+    (ignoring velocity) are dropped, and particle counts are scaled down
+    as the recent particle load rises. Emits without a count
+    (distortion, etc.) are only subject to the first of these.
+    """
+
+    # Matching emits closer than this in the same frame get dropped.
+    COALESCE_DISTANCE = 0.5
+
+    # Recent particle load at which counts begin to be scaled down.
+    SOFT_LOAD = 300.0
+
+    # Counts are never scaled below this fraction.
+    MIN_SCALE = 0.2
+
+    # How quickly the recent particle load falls off (in seconds).
+    LOAD_HALF_LIFE = 0.25
+
+    # Emits with counts are dropped once this many particles have gone
+    # out in a single frame.
+    FRAME_PARTICLE_LIMIT = 600
+
+    _STORENAME = babase.storagename()
+
+    @classmethod
+    def get(cls) -> EffectBudget:
+        """Create and/or return the current activity's budget."""
+        activity = _bascenev1.getactivity()
+        budget = activity.customdata.get(cls._STORENAME)
+        if budget is None:
+            budget = EffectBudget()
+            activity.customdata[cls._STORENAME] = budget
+        assert isinstance(budget, EffectBudget)
+        return budget
+
+    def __init__(self) -> None:
+        self._frame_time: float | None = None
+        self._frame_emits: list[tuple[tuple, tuple[float, float, float]]] = []
+        self._frame_particles = 0
+        self._load = 0.0
+
+    def get_scale(self) -> float:
+        """Return the fraction of particle counts currently let through."""
+        if self._load <= self.SOFT_LOAD:
+            return 1.0
+        return max(self.MIN_SCALE, self.SOFT_LOAD / self._load)
+
+    def emitfx(
+        self,
+        *,
+        position: Sequence[float],
+        count: int | None = None,
+        **kwargs: Any,
+    ) -> bool:
+        """Emit an effect via bascenev1.emitfx() if the budget allows.
+
+        Takes the same arguments as bascenev1.emitfx(). Returns whether
+        the effect was emitted.
+        """
+        self._update_frame()
+        point = (position[0], position[1], position[2])
+        key = tuple(
+            sorted(item for item in kwargs.items() if item[0] != 'velocity')
+        )
+        for other_key, other_point in self._frame_emits:
+            if (
+                other_key == key
+                and math.dist(other_point, point) < self.COALESCE_DISTANCE
+            ):
+                _g_counts.suppressed += 1
+                _g_counts.particles_suppressed += count or 0
+                return False
+        if count is not None:
+            if self._frame_particles >= self.FRAME_PARTICLE_LIMIT:
+                _g_counts.suppressed += 1
+                _g_counts.particles_suppressed += count
+                return False
+            scaled = max(1, round(count * self.get_scale())) if count else 0
+            _g_counts.particles_emitted += scaled
+            _g_counts.particles_suppressed += count - scaled
+            self._frame_particles += scaled
+            self._load += scaled
+            kwargs['count'] = scaled
+        self._frame_emits.append((key, point))
+        _g_counts.emitted += 1
+        _bascenev1.emitfx(position=position, **kwargs)
+        return True
+
+    def _update_frame(self) -> None:
+        now = _bascenev1.time()
+        if now == self._frame_time:
+            return
+        if self._frame_time is not None and now > self._frame_time:
+            self._load *= 0.5 ** (
+                (now - self._frame_time) / self.LOAD_HALF_LIFE
+            )
+        self._frame_time = now
+        self._frame_emits.clear()
+        self._frame_particles = 0
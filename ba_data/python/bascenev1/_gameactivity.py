@@ -1,6 +1,7 @@
 # Released under the MIT License. See LICENSE for details.
 #
 """Provides GameActivity class."""
+
 # pylint: disable=too-many-lines
 
 from __future__ import annotations
@@ -332,6 +333,37 @@ class GameActivity[PlayerT: bascenev1.Player, TeamT: bascenev1.Team](
         """
         return ''
 
+    def get_prefetch_calls(self) -> list[Callable[[], Any]]:
+        """Return calls which warm media this game will use.
+
+        Sessions which create their next game ahead of time run these
+        one at a time in the game's context while the current game is
+        still running (see :class:`~bascenev1.AssetPrefetcher`), so
+        the media is already loaded when it begins. By default this
+        covers the shared factories and the characters of the session's
+        current players; games can add calls of their own for
+        game-specific textures, sounds, meshes, etc.
+        """
+        # pylint: disable=cyclic-import
+        from bascenev1lib.gameutils import SharedObjects
+        from bascenev1lib.actor.bomb import BombFactory
+        from bascenev1lib.actor.powerupbox import PowerupBoxFactory
+        from bascenev1lib.actor.spazfactory import SpazFactory
+
+        calls: list[Callable[[], Any]] = [
+            SharedObjects.get,
+            SpazFactory.get,
+            BombFactory.get,
+            PowerupBoxFactory.get,
+        ]
+        characters: set[str] = set()
+        for sessionplayer in self.session.sessionplayers:
+            if sessionplayer.in_game:
+                characters.add(sessionplayer.character)
+        for character in sorted(characters):
+            calls.append(babase.CallStrict(_prefetch_character, character))
+        return calls
+
     @override
     def on_transition_in(self) -> None:
         super().on_transition_in()
@@ -1224,3 +1256,14 @@ class GameActivity[PlayerT: bascenev1.Player, TeamT: bascenev1.Team](
                 raise RuntimeError('No valid maps')
             map_name = valid_maps[random.randrange(len(valid_maps))]
         return map_name
+
+
+def _prefetch_character(character: str) -> None:
+    # pylint: disable=cyclic-import
+    from bascenev1lib.actor.spazfactory import SpazFactory
+
+    # Unknown characters (from mods no longer installed, etc) will get
+    # swapped out when spawning anyway.
+    assert babase.app.classic is not None
+    if character in babase.app.classic.spaz_appearances:
+        SpazFactory.get().get_media(character)
@@ -0,0 +1,190 @@
+# Released under the MIT License. See LICENSE for details.
+#
+"""Weighted, history-aware scheduling for game playlists."""
+from __future__ import annotations
+
+import random
+from collections import Counter, deque
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from typing import Any
+
+# Valid values for set_playlist_scheduler().
+PLAYLIST_SCHEDULERS = ('classic', 'weighted')
+
+# How teams/ffa sessions pick games from shuffled playlists (see
+# set_playlist_scheduler()).
+_g_playlist_scheduler: str = 'classic'
+_g_playlist_no_repeat_window: int = 2
+_g_playlist_seed: int | None = None
+
+
+def set_playlist_scheduler(
+    scheduler: str, no_repeat_window: int = 2, seed: int | None = None
+) -> None:
+    """Set how teams/ffa sessions pick games from shuffled playlists.
+
+    'classic' only avoids repeating the previous game's map or type,
+    while 'weighted' uses a bascenev1.WeightedShuffleList with the
+    provided no-repeat window and seed. Applies to sessions created
+    afterwards.
+    """
+    # pylint: disable=global-statement
+    global _g_playlist_scheduler, _g_playlist_no_repeat_window
+    global _g_playlist_seed
+    if scheduler not in PLAYLIST_SCHEDULERS:
+        raise ValueError(
+            f'Invalid playlist scheduler "{scheduler}";'
+            f' expected one of {PLAYLIST_SCHEDULERS}.'
+        )
+    _g_playlist_scheduler = scheduler
+    _g_playlist_no_repeat_window = max(0, no_repeat_window)
+    _g_playlist_seed = seed
+
+
+def get_playlist_scheduler() -> tuple[str, int, int | None]:
+    """Return the current scheduler, no-repeat window and seed."""
+    return (
+        _g_playlist_scheduler,
+        _g_playlist_no_repeat_window,
+        _g_playlist_seed,
+    )
+
+
+class WeightedShuffleList:
+    """Weighted, history-aware picker for game playlists.
+
+    Entries are picked at random in proportion to their optional
+    ``'weight'`` value (1 if absent). Entries whose map or game type
+    was used in the last ``no_repeat_window`` picks are avoided, as are
+    entries whose optional ``'min_players'``/``'max_players'`` values
+    don't fit the player count passed to :meth:`pull_next()`. If those
+    rules leave nothing to pick from, they are relaxed in turn.
+
+    Picks are drawn from an alias table built up front, so each draw is
+    O(1) and only entries being avoided cause redraws. Pass a seed for
+    a repeatable order.
+    """
+
+    # Draws to make before falling back to scanning all entries.
+    MAX_DRAWS = 16
+
+    def __init__(
+        self,
+        items: list[dict[str, Any]],
+        *,
+        no_repeat_window: int = 2,
+        seed: int | None = None,
+    ) -> None:
+        if not items:
+            raise ValueError('Playlist contains no entries.')
+        self.source_list = items
+        self.no_repeat_window = max(0, no_repeat_window)
+        self._random = random.Random(seed)
+        self._weights = [
+            max(0.0, float(item.get('weight', 1.0))) for item in items
+        ]
+        if not any(self._weights):
+            self._weights = [1.0] * len(items)
+        self._prob, self._alias = _build_alias_table(self._weights)
+        self._recent: deque[tuple[str, str]] = deque()
+        self._recent_maps: Counter[str] = Counter()
+        self._recent_types: Counter[str] = Counter()
+
+    def pull_next(self, player_count: int | None = None) -> dict[str, Any]:
+        """Pick and return the next entry."""
+        for _i in range(self.MAX_DRAWS):
+            index = self._draw()
+            if self._fits(index, player_count) and not self._is_recent(index):
+                return self._take(index)
+
+        # We keep hitting entries we want to avoid; look at everything
+        # and loosen up until we find something.
+        indices = range(len(self.source_list))
+        candidates = [
+            i
+            for i in indices
+            if self._fits(i, player_count) and not self._is_recent(i)
+        ]
+        if not candidates:
+            candidates = [
+                i
+                for i in indices
+                if self._fits(i, player_count) and not self._is_last(i)
+            ]
+        if not candidates:
+            candidates = [i for i in indices if self._fits(i, player_count)]
+        if not candidates:
+            candidates = list(indices)
+        weights = [self._weights[i] for i in candidates]
+        if not any(weights):
+            weights = [1.0] * len(candidates)
+        return self._take(self._random.choices(candidates, weights)[0])
+
+    def _draw(self) -> int:
+        index = self._random.randrange(len(self._prob))
+        if self._random.random() < self._prob[index]:
+            return index
+        return self._alias[index]
+
+    def _fits(self, index: int, player_count: int | None) -> bool:
+        if player_count is None:
+            return True
+        item = self.source_list[index]
+        min_players = item.get('min_players')
+        max_players = item.get('max_players')
+        if min_players is not None and player_count < min_players:
+            return False
+        if max_players is not None and player_count > max_players:
+            return False
+        return True
+
+    def _keys(self, index: int) -> tuple[str, str]:
+        item = self.source_list[index]
+        return item['settings']['map'], item['type']
+
+    def _is_recent(self, index: int) -> bool:
+        mapname, gametype = self._keys(index)
+        return bool(self._recent_maps[mapname] or self._recent_types[gametype])
+
+    def _is_last(self, index: int) -> bool:
+        return bool(self._recent) and self._keys(index) == self._recent[-1]
+
+    def _take(self, index: int) -> dict[str, Any]:
+        if self.no_repeat_window:
+            keys = self._keys(index)
+            self._recent.append(keys)
+            self._recent_maps[keys[0]] += 1
+            self._recent_types[keys[1]] += 1
+            if len(self._recent) > self.no_repeat_window:
+                mapname, gametype = self._recent.popleft()
+                self._recent_maps[mapname] -= 1
+                self._recent_types[gametype] -= 1
+        return self.source_list[index]
+
+
+def _build_alias_table(weights: list[float]) -> tuple[list[float], list[int]]:
+    """Build tables for Vose's alias method."""
+    count = len(weights)
+    total = sum(weights)
+    scaled = [weight * count / total for weight in weights]
+    prob = [0.0] * count
+    alias = list(range(count))
+    small = [i for i, val in enumerate(scaled) if val < 1.0]
+    large = [i for i, val in enumerate(scaled) if val >= 1.0]
+    while small and large:
+        less = small.pop()
+        more = large.pop()
+        prob[less] = scaled[less]
+        alias[less] = more
+        scaled[more] = scaled[more] + scaled[less] - 1.0
+        if scaled[more] < 1.0:
+            small.append(more)
+        else:
+            large.append(more)
+
+    # Anything left over is 1 (give or take rounding error).
+    for i in large + small:
+        prob[i] = 1.0
+    return prob, alias
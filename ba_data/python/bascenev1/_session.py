@@ -12,6 +12,8 @@ import babase
 
 import _bascenev1
 from bascenev1._player import Player
+from bascenev1._playerindex import PlayerIndex
+from bascenev1._timingwheel import TimingWheel
 
 if TYPE_CHECKING:
     from typing import Sequence, Any
@@ -172,6 +174,9 @@ class Session:
 
         self.sessionteams = []
         self.sessionplayers = []
+        self._sessionplayer_index: PlayerIndex[bascenev1.SessionPlayer] = (
+            PlayerIndex()
+        )
         self.min_players = min_players
         self.max_players = (
             max_players
@@ -233,9 +238,8 @@ class Session:
         self._sessionglobalsnode = _bascenev1.newnode('sessionglobals')
 
         # Rejoin cooldown stuff.
-        self._players_on_wait: dict = {}
+        self._rejoin_cooldowns: TimingWheel[str, None] = TimingWheel()
         self._player_requested_identifiers: dict = {}
-        self._waitlist_timers: dict = {}
 
     @property
     def context(self) -> bascenev1.ContextRef:
@@ -287,18 +291,21 @@ class Session:
                 )
                 return False
 
+        # Server bans.
+        classic = babase.app.classic
+        if (
+            classic is not None
+            and classic.server is not None
+            and classic.server.reject_if_banned(player)
+        ):
+            return False
+
         # Rejoin cooldown.
         identifier = player.get_v1_account_id()
         if identifier:
-            leave_time = self._players_on_wait.get(identifier)
-            if leave_time:
-                diff = str(
-                    math.ceil(
-                        _g_player_rejoin_cooldown
-                        - babase.apptime()
-                        + leave_time
-                    )
-                )
+            remaining = self._rejoin_cooldowns.remaining(identifier)
+            if remaining is not None:
+                diff = str(math.ceil(remaining))
                 _bascenev1.broadcastmessage(
                     babase.Lstr(
                         translate=(
@@ -317,6 +324,21 @@ class Session:
         _bascenev1.getsound('dripity').play()
         return True
 
+    def get_sessionplayers_for_client(
+        self, client_id: int
+    ) -> list[bascenev1.SessionPlayer]:
+        """Return the session's players belonging to a client.
+
+        The host's local players have a client id of -1.
+        """
+        return self._sessionplayer_index.get_by_client_id(client_id)
+
+    def get_sessionplayers_for_account(
+        self, account_id: str
+    ) -> list[bascenev1.SessionPlayer]:
+        """Return the session's players signed in with a v1 account id."""
+        return self._sessionplayer_index.get_by_account_id(account_id)
+
     def on_player_leave(self, sessionplayer: bascenev1.SessionPlayer) -> None:
         """Called when a previously-accepted bascenev1.SessionPlayer leaves."""
 
@@ -333,15 +355,10 @@ class Session:
 
         # Rejoin cooldown.
         identifier = self._player_requested_identifiers.get(sessionplayer.id)
-        if identifier:
-            self._players_on_wait[identifier] = babase.apptime()
-            with babase.ContextRef.empty():
-                self._waitlist_timers[identifier] = babase.AppTimer(
-                    _g_player_rejoin_cooldown,
-                    babase.CallStrict(
-                        self._remove_player_from_waitlist, identifier
-                    ),
-                )
+        if identifier and _g_player_rejoin_cooldown > 0.0:
+            self._rejoin_cooldowns.add(
+                identifier, _g_player_rejoin_cooldown, None
+            )
 
         if not sessionplayer.in_game:
             # Ok, the player is still in the lobby; simply remove them.
@@ -389,6 +406,8 @@ class Session:
 
         # Now remove them from the session list.
         self.sessionplayers.remove(sessionplayer)
+        self._sessionplayer_index.remove(sessionplayer)
+        self.stats.player_left(sessionplayer)
 
     def _remove_player_team(
         self,
@@ -619,6 +638,18 @@ class Session:
     def _complete_end_activity(
         self, activity: bascenev1.Activity, results: Any
     ) -> None:
+        from bascenev1._gameresults import GameResults
+
+        # If we're a server keeping persistent stats, record this game
+        # before the subclass moves on (and resets per-game scores).
+        classic = babase.app.classic
+        if (
+            classic is not None
+            and classic.server is not None
+            and isinstance(results, GameResults)
+        ):
+            classic.server.record_game_results(activity, results)
+
         # Run the subclass callback in the session context.
         try:
             with self.context:
@@ -650,6 +681,7 @@ class Session:
         # If they said yes, add the player to the lobby.
         if result:
             self.sessionplayers.append(sessionplayer)
+            self._sessionplayer_index.add(sessionplayer, sessionplayer)
             with self.context:
                 try:
                     self.lobby.add_chooser(sessionplayer)
@@ -852,9 +884,3 @@ class Session:
         if pass_to_activity:
             activity.add_player(sessionplayer)
         return sessionplayer
-
-    def _remove_player_from_waitlist(self, identifier: str) -> None:
-        try:
-            self._players_on_wait.pop(identifier)
-        except KeyError:
-            pass
@@ -3,9 +3,11 @@
 """Functionality related to scores and statistics."""
 from __future__ import annotations
 
+import bisect
 import random
 import weakref
 import logging
+import itertools
 from typing import TYPE_CHECKING
 from dataclasses import dataclass
 
@@ -13,9 +15,8 @@ import babase
 
 import _bascenev1
 
-
 if TYPE_CHECKING:
-    from typing import Any, Sequence
+    from typing import Any, Iterable, Sequence
 
     import bascenev1
 
@@ -28,6 +29,28 @@ class PlayerScoredMessage:
     """The score value."""
 
 
+@dataclass
+class AccountGameStats:
+    """Stats for a signed-in player's account in the current game.
+
+    Unlike bascenev1.PlayerRecord (which is keyed by player name), these
+    are keyed by v1 account id and tallied as things happen, so players
+    joining under the same name never share them.
+    """
+
+    account_id: str
+
+    #: The name the account most recently played under.
+    name: str
+
+    score: int = 0
+    kills: int = 0
+    deaths: int = 0
+
+    #: The team the account most recently played on.
+    sessionteam: weakref.ref[bascenev1.SessionTeam] | None = None
+
+
 class PlayerRecord:
     """Stats for an individual player in a bascenev1.Stats object.
 
@@ -38,6 +61,8 @@ class PlayerRecord:
 
     character: str
 
+    _ids = itertools.count()
+
     def __init__(
         self,
         name: str,
@@ -56,6 +81,7 @@ class PlayerRecord:
         self._multi_kill_timer: bascenev1.Timer | None = None
         self._multi_kill_count = 0
         self._stats = weakref.ref(stats)
+        self._id = next(self._ids)
         self._last_sessionplayer: bascenev1.SessionPlayer | None = None
         self._sessionplayer: bascenev1.SessionPlayer | None = None
         self._sessionteam: weakref.ref[bascenev1.SessionTeam] | None = None
@@ -137,6 +163,10 @@ class PlayerRecord:
         self._multi_kill_count += 1
         stats = self._stats()
         assert stats
+
+        # Any bonus goes to whoever made this kill, even if someone else
+        # takes over this record before it is applied.
+        sessionplayer = self._sessionplayer
         if self._multi_kill_count == 1:
             score = 0
             name = None
@@ -229,6 +259,12 @@ class PlayerRecord:
 
             self.score += score2
             self.accumscore += score2
+            stats2 = self._stats()
+            if stats2 is not None:
+                stats2.record_changed(self)
+                if sessionplayer:
+                    # pylint: disable=protected-access
+                    stats2._tally_account(sessionplayer, score=score2)
 
             # Inform a running game of the score.
             if score2 != 0 and activity is not None:
@@ -247,12 +283,64 @@ class PlayerRecord:
         self._multi_kill_timer = _bascenev1.Timer(1.0, self._end_multi_kill)
 
 
+class _RecordRanking:
+    """Records kept sorted (highest first) by a single attribute."""
+
+    def __init__(self, attr: str, records: Iterable[PlayerRecord]) -> None:
+        self._attr = attr
+        self._values: dict[int, int] = {}
+        self._entries: list[tuple[int, int, PlayerRecord]] = []
+        for record in records:
+            self.add(record)
+
+    def add(self, record: PlayerRecord) -> None:
+        """Add a record (if not already present)."""
+        # pylint: disable=protected-access
+        if record._id in self._values:
+            return
+        value = getattr(record, self._attr)
+        self._values[record._id] = value
+        bisect.insort(self._entries, (-value, record._id, record))
+
+    def remove(self, record: PlayerRecord) -> None:
+        """Remove a record (if present)."""
+        # pylint: disable=protected-access
+        value = self._values.pop(record._id, None)
+        if value is None:
+            return
+        index = bisect.bisect_left(self._entries, (-value, record._id))
+        del self._entries[index]
+
+    def update(self, record: PlayerRecord) -> None:
+        """Move a record to match its current value."""
+        # pylint: disable=protected-access
+        value = self._values.get(record._id)
+        if value is None or value == getattr(record, self._attr):
+            return
+        self.remove(record)
+        self.add(record)
+
+    def get(self) -> list[PlayerRecord]:
+        """Return records in order."""
+        return [entry[2] for entry in self._entries]
+
+
 class Stats:
     """Manages scores and statistics for a bascenev1.Session."""
 
+    #: Attributes :meth:`get_sorted_records()` can sort by.
+    SORT_ORDERS = ('score', 'accumscore', 'kill_count', 'accum_kill_count')
+
     def __init__(self) -> None:
         self._activity: weakref.ref[bascenev1.Activity] | None = None
         self._player_records: dict[str, PlayerRecord] = {}
+
+        # Records for still-existing players (see get_records()) and
+        # sorted views of them; built on demand and kept up to date as
+        # players come and go and scores change.
+        self._current_records: dict[str, PlayerRecord] | None = None
+        self._rankings: dict[str, _RecordRanking] = {}
+        self._account_stats: dict[str, AccountGameStats] = {}
         self.orchestrahitsound1: bascenev1.Sound | None = None
         self.orchestrahitsound2: bascenev1.Sound | None = None
         self.orchestrahitsound3: bascenev1.Sound | None = None
@@ -294,6 +382,9 @@ class Stats:
         for p_entry in list(self._player_records.values()):
             p_entry.cancel_multi_kill_timer()
         self._player_records = {}
+        self._current_records = {}
+        self._rankings = {}
+        self._account_stats = {}
 
     def reset_accum(self) -> None:
         """Reset per-sound sub-scores."""
@@ -303,6 +394,8 @@ class Stats:
             s_player.accum_kill_count = 0
             s_player.accum_killed_count = 0
             s_player.streak = 0
+        self._rankings = {}
+        self._account_stats = {}
 
     def register_sessionplayer(self, player: bascenev1.SessionPlayer) -> None:
         """Register a bascenev1.SessionPlayer with this score-set."""
@@ -311,24 +404,125 @@ class Stats:
         if name in self._player_records:
             # If the player already exists, update his character and such as
             # it may have changed.
-            self._player_records[name].associate_with_sessionplayer(player)
+            record = self._player_records[name]
+            record.associate_with_sessionplayer(player)
         else:
             name_full = player.getname(full=True)
-            self._player_records[name] = PlayerRecord(
-                name, name_full, player, self
-            )
+            record = PlayerRecord(name, name_full, player, self)
+            self._player_records[name] = record
+
+        # This record now refers to a current player.
+        if self._current_records is not None:
+            self._current_records[name] = record
+        for ranking in self._rankings.values():
+            ranking.add(record)
+
+        # Make sure signed-in players count as taking part in the game
+        # even if they never score.
+        self._tally_account(player)
+
+    def player_left(self, player: bascenev1.SessionPlayer) -> None:
+        """Should be called when a bascenev1.SessionPlayer leaves.
+
+        Drops their record from get_records() results (the record itself
+        is kept in case they come back).
+        """
+        record = self._player_records.get(player.getname())
+        if record is None or record.get_last_sessionplayer() is not player:
+            return
+        if self._current_records is not None:
+            self._current_records.pop(record.name, None)
+        for ranking in self._rankings.values():
+            ranking.remove(record)
+
+    def invalidate_records(self) -> None:
+        """Rebuild get_records() results from scratch on the next call.
+
+        Players coming and going is handled automatically; this only
+        needs to be called after renaming an already-registered
+        bascenev1.SessionPlayer.
+        """
+        self._current_records = None
+        self._rankings = {}
+
+    def record_changed(self, record: PlayerRecord) -> None:
+        """Should be called after changing a record's score or kills.
+
+        Keeps get_sorted_records() results in order.
+        """
+        for ranking in self._rankings.values():
+            ranking.update(record)
 
     def get_records(self) -> dict[str, bascenev1.PlayerRecord]:
         """Get PlayerRecord corresponding to still-existing players."""
-        records = {}
+        if self._current_records is None:
+            records = {}
+
+            # Go through our player records and return ones whose player id
+            # still corresponds to a player with that name.
+            for record_id, record in self._player_records.items():
+                lastplayer = record.get_last_sessionplayer()
+                if lastplayer and lastplayer.getname() == record_id:
+                    records[record_id] = record
+            self._current_records = records
+        return dict(self._current_records)
+
+    def get_account_stats(self) -> list[AccountGameStats]:
+        """Get stats for each account taking part in the current game.
+
+        Includes accounts whose players have since left. These are reset
+        along with per-game ('accum') values on records.
+        """
+        return list(self._account_stats.values())
 
-        # Go through our player records and return ones whose player id still
-        # corresponds to a player with that name.
-        for record_id, record in self._player_records.items():
-            lastplayer = record.get_last_sessionplayer()
-            if lastplayer and lastplayer.getname() == record_id:
-                records[record_id] = record
-        return records
+    def _tally_account(
+        self,
+        sessionplayer: bascenev1.SessionPlayer,
+        *,
+        score: int = 0,
+        kills: int = 0,
+        deaths: int = 0,
+    ) -> None:
+        """Add to the stats for a player's account (if signed in)."""
+        try:
+            account_id = sessionplayer.get_v1_account_id()
+            name = sessionplayer.getname(full=True)
+            sessionteam = sessionplayer.sessionteam
+        except Exception:
+            logging.exception('Error getting account for %s.', sessionplayer)
+            return
+        if account_id is None:
+            return
+        entry = self._account_stats.get(account_id)
+        if entry is None:
+            entry = self._account_stats[account_id] = AccountGameStats(
+                account_id=account_id, name=name
+            )
+        entry.name = name
+        entry.sessionteam = weakref.ref(sessionteam)
+        entry.score += score
+        entry.kills += kills
+        entry.deaths += deaths
+
+    def get_sorted_records(
+        self, order: str = 'score'
+    ) -> list[bascenev1.PlayerRecord]:
+        """Get get_records() results sorted by an attribute, highest first.
+
+        order can be any of SORT_ORDERS. Records with equal values keep
+        the order they were registered in.
+        """
+        ranking = self._rankings.get(order)
+        if ranking is None:
+            if order not in self.SORT_ORDERS:
+                raise ValueError(
+                    f'Invalid order "{order}";'
+                    f' expected one of {self.SORT_ORDERS}.'
+                )
+            ranking = self._rankings[order] = _RecordRanking(
+                order, self.get_records().values()
+            )
+        return ranking.get()
 
     def player_scored(
         self,
@@ -444,6 +638,10 @@ class Stats:
 
         s_player.score += points
         s_player.accumscore += points
+        self.record_changed(s_player)
+        self._tally_account(
+            player.sessionplayer, score=points, kills=1 if kill else 0
+        )
 
         # Inform a running game of the score.
         if points != 0:
@@ -466,6 +664,7 @@ class Stats:
         if killed:
             prec.accum_killed_count += 1
             prec.killed_count += 1
+            self._tally_account(player.sessionplayer, deaths=1)
         try:
             if killed and _bascenev1.getactivity().announce_player_deaths:
                 if killer is player:
@@ -354,6 +354,10 @@ class Blast(bs.Actor):
         shared = SharedObjects.get()
         factory = BombFactory.get()
 
+        # Chain reactions can pile up a lot of effects; let the budget
+        # thin them out.
+        budget = bs.EffectBudget.get()
+
         self.blast_type = blast_type
         self._source_player = source_player
         self.hit_type = hit_type
@@ -392,21 +396,21 @@ class Blast(bs.Actor):
         bs.timer(1.0, explosion.delete)
 
         if self.blast_type != 'ice':
-            bs.emitfx(
+            budget.emitfx(
                 position=position,
                 velocity=velocity,
                 count=int(1.0 + random.random() * 4),
                 emit_type='tendrils',
                 tendril_type='thin_smoke',
             )
-        bs.emitfx(
+        budget.emitfx(
             position=position,
             velocity=velocity,
             count=int(4.0 + random.random() * 4),
             emit_type='tendrils',
             tendril_type='ice' if self.blast_type == 'ice' else 'smoke',
         )
-        bs.emitfx(
+        budget.emitfx(
             position=position,
             emit_type='distortion',
             spread=1.0 if self.blast_type == 'tnt' else 2.0,
@@ -416,7 +420,7 @@ class Blast(bs.Actor):
         if self.blast_type == 'ice':
 
             def emit() -> None:
-                bs.emitfx(
+                budget.emitfx(
                     position=position,
                     velocity=velocity,
                     count=30,
@@ -432,14 +436,14 @@ class Blast(bs.Actor):
         elif self.blast_type == 'sticky':
 
             def emit() -> None:
-                bs.emitfx(
+                budget.emitfx(
                     position=position,
                     velocity=velocity,
                     count=int(4.0 + random.random() * 8),
                     spread=0.7,
                     chunk_type='slime',
                 )
-                bs.emitfx(
+                budget.emitfx(
                     position=position,
                     velocity=velocity,
                     count=int(4.0 + random.random() * 8),
@@ -447,7 +451,7 @@ class Blast(bs.Actor):
                     spread=0.7,
                     chunk_type='slime',
                 )
-                bs.emitfx(
+                budget.emitfx(
                     position=position,
                     velocity=velocity,
                     count=15,
@@ -455,7 +459,7 @@ class Blast(bs.Actor):
                     chunk_type='slime',
                     emit_type='stickers',
                 )
-                bs.emitfx(
+                budget.emitfx(
                     position=position,
                     velocity=velocity,
                     count=20,
@@ -463,7 +467,7 @@ class Blast(bs.Actor):
                     chunk_type='spark',
                     emit_type='stickers',
                 )
-                bs.emitfx(
+                budget.emitfx(
                     position=position,
                     velocity=velocity,
                     count=int(6.0 + random.random() * 12),
@@ -478,21 +482,21 @@ class Blast(bs.Actor):
         elif self.blast_type == 'impact':
 
             def emit() -> None:
-                bs.emitfx(
+                budget.emitfx(
                     position=position,
                     velocity=velocity,
                     count=int(4.0 + random.random() * 8),
                     scale=0.8,
                     chunk_type='metal',
                 )
-                bs.emitfx(
+                budget.emitfx(
                     position=position,
                     velocity=velocity,
                     count=int(4.0 + random.random() * 8),
                     scale=0.4,
                     chunk_type='metal',
                 )
-                bs.emitfx(
+                budget.emitfx(
                     position=position,
                     velocity=velocity,
                     count=20,
@@ -500,7 +504,7 @@ class Blast(bs.Actor):
                     chunk_type='spark',
                     emit_type='stickers',
                 )
-                bs.emitfx(
+                budget.emitfx(
                     position=position,
                     velocity=velocity,
                     count=int(8.0 + random.random() * 15),
@@ -516,20 +520,20 @@ class Blast(bs.Actor):
 
             def emit() -> None:
                 if self.blast_type != 'tnt':
-                    bs.emitfx(
+                    budget.emitfx(
                         position=position,
                         velocity=velocity,
                         count=int(4.0 + random.random() * 8),
                         chunk_type='rock',
                     )
-                    bs.emitfx(
+                    budget.emitfx(
                         position=position,
                         velocity=velocity,
                         count=int(4.0 + random.random() * 8),
                         scale=0.5,
                         chunk_type='rock',
                     )
-                bs.emitfx(
+                budget.emitfx(
                     position=position,
                     velocity=velocity,
                     count=30,
@@ -537,7 +541,7 @@ class Blast(bs.Actor):
                     chunk_type='spark',
                     emit_type='stickers',
                 )
-                bs.emitfx(
+                budget.emitfx(
                     position=position,
                     velocity=velocity,
                     count=int(18.0 + random.random() * 20),
@@ -550,7 +554,7 @@ class Blast(bs.Actor):
                 if self.blast_type == 'tnt':
 
                     def emit_splinters() -> None:
-                        bs.emitfx(
+                        budget.emitfx(
                             position=position,
                             velocity=velocity,
                             count=int(20.0 + random.random() * 25),
@@ -565,7 +569,7 @@ class Blast(bs.Actor):
                 if self.blast_type == 'tnt' or random.random() < 0.1:
 
                     def emit_extra_sparks() -> None:
-                        bs.emitfx(
+                        budget.emitfx(
                             position=position,
                             velocity=velocity,
                             count=int(10.0 + random.random() * 20),
@@ -5,13 +5,18 @@
 
 from __future__ import annotations
 
+import sys
+import copy
+import time
 import random
 import weakref
 import logging
+from dataclasses import dataclass
 from typing import TYPE_CHECKING, override
 
 import bascenev1 as bs
 from bascenev1lib.actor.spaz import Spaz
+from bascenev1lib.actor.bottargets import BotTargetIndex
 
 if TYPE_CHECKING:
     from typing import Any, Sequence, Callable
@@ -24,6 +29,9 @@ DEFAULT_BOT_HIGHLIGHT = (0.1, 0.3, 0.1)
 PRO_BOT_COLOR = (1.0, 0.2, 0.1)
 PRO_BOT_HIGHLIGHT = (0.6, 0.1, 0.05)
 
+# Placeholder for attrs of bots being recycled (see SpazBot.recycle()).
+_RECYCLED = object()
+
 
 class SpazBotPunchedMessage:
     """A message saying a bs.SpazBot got punched."""
@@ -100,6 +108,15 @@ class SpazBot(Spaz):
     color = DEFAULT_BOT_COLOR
     highlight = DEFAULT_BOT_HIGHLIGHT
 
+    # AI level-of-detail (see get_ai_update_period()). Bots further
+    # than ai_near_dist from any target update their AI once every
+    # ai_far_period passes of their bot-set, and bots with nothing to
+    # do at all once every ai_idle_period passes.
+    ai_lod = True
+    ai_near_dist = 10.0
+    ai_far_period = 2
+    ai_idle_period = 4
+
     def __init__(self) -> None:
         """Instantiate a spaz-bot."""
         super().__init__(
@@ -140,6 +157,10 @@ class SpazBot(Spaz):
         self._throw_release_time: float | None = None
         self._have_dropped_throw_bomb: bool | None = None
         self._player_pts: list[tuple[bs.Vec3, bs.Vec3]] | None = None
+        self._ai_passes_skipped = 0
+        self._target_player: tuple[Sequence[float], Sequence[float]] | None = (
+            None
+        )
 
         # These cooldowns didn't exist when these bots were calibrated,
         # so take them out of the equation.
@@ -163,12 +184,18 @@ class SpazBot(Spaz):
 
         Both values will be None in the case of no target.
         """
+        if self._player_pts is None:
+            # Our bot-set has already looked up our target for us.
+            if self._target_player is None:
+                return None, None
+            plpt, plvel = self._target_player
+            return bs.Vec3(plpt), bs.Vec3(plvel)
+
         assert self.node
         botpt = bs.Vec3(self.node.position)
         closest_dist: float | None = None
         closest_vel: bs.Vec3 | None = None
         closest: bs.Vec3 | None = None
-        assert self._player_pts is not None
         for plpt, plvel in self._player_pts:
             dist = (plpt - botpt).length()
 
@@ -193,6 +220,75 @@ class SpazBot(Spaz):
         """Provide the spaz-bot with the locations of its enemies."""
         self._player_pts = pts
 
+    def set_target_player(
+        self, target: tuple[Sequence[float], Sequence[float]] | None
+    ) -> None:
+        """Provide the spaz-bot with the location of its nearest enemy.
+
+        Takes a position and velocity (or None for no target). Bot-sets
+        use this to hand out targets they've looked up for all of their
+        bots at once. Replaces any points from set_player_points().
+        """
+        self._player_pts = None
+        self._target_player = target
+
+    def recycle(self) -> None:
+        """Reinitialize a retired bot so it can be spawned again.
+
+        Bot-sets with pooling enabled use this in place of creating new
+        bots (see bs.SpazBotSet). The bot comes back as a brand new one
+        with a fresh node, so its old node must be gone and nothing else
+        may still be referencing it.
+        """
+        assert not self.node and not self.expired
+
+        # Run our constructor over our existing attributes so their
+        # storage gets reused, then drop any a new bot wouldn't have
+        # (such as ones tacked on by games).
+        attrs = self.__dict__
+        for key in attrs:
+            attrs[key] = _RECYCLED
+        type(self).__init__(self)
+        for key in [key for key, val in attrs.items() if val is _RECYCLED]:
+            del attrs[key]
+
+    def get_ai_update_period(self, target_dist: float | None) -> int:
+        """Return how many bot-set passes should go by per AI update.
+
+        Bot-sets pass over their bots at the rate bot AI was calibrated
+        for. Bots in the thick of things update on every pass, while
+        ones far from their target (or with nothing to do) update less
+        often. Set ai_lod to False on a bot class to have its bots
+        always update on every pass.
+        """
+        if (
+            not self.ai_lod
+            or self.update_callback is not None
+            or self.target_flag is not None
+            or self._mode == 'throw'
+            or self.held_count > 0
+            or not self.node
+            or self.node.hold_node
+            or bs.time() - self.last_attacked_time < 2.0
+        ):
+            return 1
+        if target_dist is None:
+            if self.target_point_default is None:
+                return self.ai_idle_period
+            return self.ai_far_period
+        return 1 if target_dist < self.ai_near_dist else self.ai_far_period
+
+    def ai_update_due(self, target_dist: float | None) -> bool:
+        """Called by bot-sets on each pass; returns whether to update AI.
+
+        Takes the distance to the bot's nearest target (None if none).
+        """
+        self._ai_passes_skipped += 1
+        if self._ai_passes_skipped < self.get_ai_update_period(target_dist):
+            return False
+        self._ai_passes_skipped = 0
+        return True
+
     def update_ai(self) -> None:
         """Should be called periodically to update the spaz' AI."""
         # pylint: disable=too-many-branches
@@ -737,6 +833,7 @@ class ChargerBot(SpazBot):
     throw_dist_min = 9999
     throw_dist_max = 9999
     points_mult = 2
+    ai_lod = False
 
 
 class BouncyBot(SpazBot):
@@ -887,6 +984,7 @@ class ExplodeyBot(SpazBot):
     throw_dist_max = 9999
     start_cursed = True
     points_mult = 4
+    ai_lod = False
 
 
 class ExplodeyBotNoTimeLimit(ExplodeyBot):
@@ -969,18 +1067,91 @@ class DemoBot(SpazBot):
         return super().handlemessage(msg)
 
 
+def _is_unreferenced(bot: SpazBot) -> bool:
+    """Return whether a pooled bot is safe to recycle.
+
+    Anything still referencing a retired bot (timers, weak calls, bombs
+    it dropped, etc.) could poke at it after it comes back, so we only
+    reuse bots nothing else can reach.
+    """
+    # Strong refs should only come from our caller's pool, our arg, and
+    # getrefcount()'s own arg.
+    return not weakref.getweakrefcount(bot) and sys.getrefcount(bot) <= 3
+
+
+@dataclass
+class SpazBotSetStats:
+    """Counts of spawns and AI updates run by a bs.SpazBotSet.
+
+    category: Bot Classes
+    """
+
+    #: Update ticks run.
+    ticks: int = 0
+
+    #: Bot AI updates run.
+    updates: int = 0
+
+    #: Bot AI updates skipped due to level-of-detail (see
+    #: bs.SpazBot.get_ai_update_period()).
+    skipped: int = 0
+
+    #: Bot AI updates pushed to the following tick to keep within the
+    #: set's time budget.
+    deferred: int = 0
+
+    #: Bot AI updates run on the most recent tick.
+    last_tick_updates: int = 0
+
+    #: Most bot AI updates run on a single tick.
+    max_tick_updates: int = 0
+
+    #: Bots spawned by recycling pooled ones.
+    pooled_spawns: int = 0
+
+    #: Bots spawned by creating new ones.
+    new_spawns: int = 0
+
+
 class SpazBotSet:
     """A container/controller for one or more bs.SpazBots.
 
     category: Bot Classes
     """
 
-    def __init__(self) -> None:
-        """Create a bot-set."""
+    # Time between AI passes over each bot (the rate bot AI was
+    # calibrated for).
+    PASS_INTERVAL = 0.25
+
+    def __init__(
+        self,
+        bucket_count: int = 5,
+        ai_time_budget: float | None = 0.004,
+        pool_size: int = 0,
+    ) -> None:
+        """Create a bot-set.
+
+        Bots are spread across bucket_count buckets, one of which gets
+        updated on each tick; more buckets means smaller batches more
+        often. If ai_time_budget is set, any bots that don't fit in that
+        many seconds of AI updates on a tick get pushed to the next.
+
+        If pool_size is nonzero, up to that many retired bots (whose
+        nodes are gone) of each class are kept and recycled for later
+        spawns of that class (see bs.SpazBot.recycle()). A retired bot
+        is only reused once nothing else (timers, bombs it dropped,
+        etc.) references it. This is meant for wave-based games which
+        spawn lots of the same bots.
+        """
 
         # We spread our bots out over a few lists so we can update
         # them in a staggered fashion.
-        self._bot_list_count = 5
+        self._bot_list_count = max(1, bucket_count)
+        self.ai_time_budget = ai_time_budget
+        self._deferred_bots: list[SpazBot] = []
+        self._stats = SpazBotSetStats()
+        self.pool_size = pool_size
+        self._pools: dict[type[SpazBot], list[SpazBot]] = {}
         self._bot_add_list = 0
         self._bot_update_list = 0
         self._bot_lists: list[list[SpazBot]] = [
@@ -1020,7 +1191,12 @@ class SpazBotSet:
         pos: Sequence[float],
         on_spawn_call: Callable[[SpazBot], Any] | None,
     ) -> None:
-        spaz = bot_type()
+        spaz = self._take_pooled_bot(bot_type)
+        if spaz is None:
+            spaz = bot_type()
+            self._stats.new_spawns += 1
+        else:
+            self._stats.pooled_spawns += 1
         self._spawn_sound.play(position=pos)
         assert spaz.node
         spaz.node.handlemessage('flash')
@@ -1037,6 +1213,10 @@ class SpazBotSet:
             any(b.is_alive() for b in l) for l in self._bot_lists
         )
 
+    def get_stats(self) -> SpazBotSetStats:
+        """Return counts of spawns and AI updates run by the set so far."""
+        return copy.copy(self._stats)
+
     def get_living_bots(self) -> list[SpazBot]:
         """Get the living bots in the set."""
         bots: list[SpazBot] = []
@@ -1050,6 +1230,8 @@ class SpazBotSet:
         # Update one of our bot lists each time through.
         # First off, remove no-longer-existing bots from the list.
         try:
+            if self.pool_size:
+                self._retire_bots(self._bot_lists[self._bot_update_list])
             bot_list = self._bot_lists[self._bot_update_list] = [
                 b for b in self._bot_lists[self._bot_update_list] if b
             ]
@@ -1063,8 +1245,11 @@ class SpazBotSet:
             self._bot_update_list + 1
         ) % self._bot_list_count
 
-        # Update our list of player points for the bots to use.
-        player_pts = []
+        self._update_bots(bot_list, self._get_targets())
+
+    def _get_targets(self) -> BotTargetIndex:
+        """Gather points for everything our bots can go after."""
+        targets = BotTargetIndex()
         for player in bs.getactivity().players:
             assert isinstance(player, bs.Player)
             try:
@@ -1074,18 +1259,58 @@ class SpazBotSet:
                 if player.is_alive():
                     assert isinstance(player.actor, Spaz)
                     assert player.actor.node
-                    player_pts.append(
-                        (
-                            bs.Vec3(player.actor.node.position),
-                            bs.Vec3(player.actor.node.velocity),
-                        )
+                    targets.add(
+                        player.actor.node.position, player.actor.node.velocity
                     )
             except Exception:
                 logging.exception('Error on bot-set _update.')
+        return targets
 
-        for bot in bot_list:
-            bot.set_player_points(player_pts)
+    def _update_bots(
+        self, bot_list: list[SpazBot], targets: BotTargetIndex
+    ) -> None:
+        """Look up targets for a list of bots and update their AI."""
+        start_time = time.perf_counter()
+
+        # Anything pushed back from last tick goes first.
+        deferred = [b for b in self._deferred_bots if b]
+        self._deferred_bots = []
+        deferred_ids = {id(b) for b in deferred}
+        if deferred:
+            bot_list = deferred + [
+                b for b in bot_list if id(b) not in deferred_ids
+            ]
+
+        found, dists = targets.find_nearest_with_distances(
+            [bot.node.position if bot.node else None for bot in bot_list]
+        )
+        due = [
+            (bot, target)
+            for bot, target, dist in zip(bot_list, found, dists)
+            if id(bot) in deferred_ids or bot.ai_update_due(dist)
+        ]
+
+        # Always update at least one bot so nothing can get stuck.
+        updated = 0
+        for bot, target in due:
+            if (
+                updated
+                and self.ai_time_budget is not None
+                and time.perf_counter() - start_time > self.ai_time_budget
+            ):
+                self._deferred_bots = [b for b, _t in due[updated:]]
+                break
+            bot.set_target_player(target)
             bot.update_ai()
+            updated += 1
+
+        stats = self._stats
+        stats.ticks += 1
+        stats.updates += updated
+        stats.skipped += len(bot_list) - len(due)
+        stats.deferred += len(self._deferred_bots)
+        stats.last_tick_updates = updated
+        stats.max_tick_updates = max(stats.max_tick_updates, updated)
 
     def clear(self) -> None:
         """Immediately clear out any bots in the set."""
@@ -1098,12 +1323,17 @@ class SpazBotSet:
         for i, bot_list in enumerate(self._bot_lists):
             for bot in bot_list:
                 bot.handlemessage(bs.DieMessage(immediate=True))
+            if self.pool_size:
+                self._retire_bots(bot_list)
             self._bot_lists[i] = []
+        self._deferred_bots = []
 
     def start_moving(self) -> None:
         """Start processing bot AI updates so they start doing their thing."""
         self._bot_update_timer = bs.Timer(
-            0.05, bs.WeakCallStrict(self._update), repeat=True
+            self.PASS_INTERVAL / self._bot_list_count,
+            bs.WeakCallStrict(self._update),
+            repeat=True,
         )
 
     def stop_moving(self) -> None:
@@ -1113,6 +1343,7 @@ class SpazBotSet:
         enemy bots to just stand and look bewildered.
         """
         self._bot_update_timer = None
+        self._deferred_bots = []
         for botlist in self._bot_lists:
             for bot in botlist:
                 if bot.node:
@@ -1172,6 +1403,36 @@ class SpazBotSet:
         self._bot_lists[self._bot_add_list].append(bot)
         self._bot_add_list = (self._bot_add_list + 1) % self._bot_list_count
 
+    def _retire_bots(self, bots: list[SpazBot]) -> None:
+        """Move any bots whose nodes are gone into our pools."""
+        for bot in bots:
+            activity = bot.getactivity(doraise=False)
+            if bot or bot.expired or activity is None:
+                continue
+
+            # Retired bots are out of the game, so have them drop any
+            # callbacks and stop counting as live actors (recycling
+            # adds them back). Full pools make room by letting go of
+            # their oldest bots.
+            bot.on_expire()
+            activity.remove_actor_weak_ref(bot)
+            pool = self._pools.setdefault(type(bot), [])
+            if len(pool) >= self.pool_size:
+                del pool[0]
+            pool.append(bot)
+
+    def _take_pooled_bot(self, bot_type: type[SpazBot]) -> SpazBot | None:
+        """Recycle and return a pooled bot of a type if one is free."""
+        pool = self._pools.get(bot_type)
+        if not pool:
+            return None
+        for i in range(len(pool)):
+            if _is_unreferenced(pool[i]):
+                bot = pool.pop(i)
+                bot.recycle()
+                return bot
+        return None
+
 
 class DemoSpazBotSet(SpazBotSet):
     """A bs.SpazBotSet that has its bs.SpazBots attack every other bs.Spaz
@@ -1181,33 +1442,11 @@ class DemoSpazBotSet(SpazBotSet):
     """
 
     @override
-    def _update(self) -> None:
-        # Update one of our bot lists each time through.
-        # First off, remove no-longer-existing bots from the list.
-        try:
-            bot_list = self._bot_lists[self._bot_update_list] = [
-                b for b in self._bot_lists[self._bot_update_list] if b
-            ]
-        except Exception:
-            bot_list = []
-            logging.exception(
-                'Error updating bot list: %s',
-                self._bot_lists[self._bot_update_list],
-            )
-        self._bot_update_list = (
-            self._bot_update_list + 1
-        ) % self._bot_list_count
-
-        # Update our list of player points for the bots to use.
-        spaz_pts = []
+    def _get_targets(self) -> BotTargetIndex:
+        targets = BotTargetIndex()
         our_bots = self.get_living_bots()
         for node in bs.getnodes():
             spaz = node.getdelegate(Spaz)
             if spaz and spaz.is_alive() and spaz not in our_bots:
-                spaz_pts.append(
-                    (bs.Vec3(node.position), bs.Vec3(node.velocity))
-                )
-
-        for bot in bot_list:
-            bot.set_player_points(spaz_pts)
-            bot.update_ai()
+                targets.add(node.position, node.velocity)
+        return targets
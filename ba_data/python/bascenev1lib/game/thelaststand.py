@@ -87,7 +87,9 @@ class TheLastStandGame(bs.CoopGameActivity[Player, Team]):
         self._excludepowerups: list[str] = []
         self._scoreboard: Scoreboard | None = None
         self._score = 0
-        self._bots = SpazBotSet()
+
+        # We spawn lots of the same bots wave after wave; recycle them.
+        self._bots = SpazBotSet(pool_size=10)
         self._dingsound = bs.getsound('dingSmall')
         self._dingsoundhigh = bs.getsound('dingSmallHigh')
         self._tntspawner: TNTSpawner | None = None
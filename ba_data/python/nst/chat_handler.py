@@ -39,10 +39,11 @@ def in_game_chat(msg: str, client_id: int) -> None:
         return
 
     # Get players matching the client id
-    player = next((p for p in activity.players if p.sessionplayer.inputdevice.client_id == client_id), None)
+    players = activity.get_players_for_client(client_id)
 
-    if player is None:
+    if not players:
         return
+    player = players[0]
 
     spaz = player.actor
     # Don't do our silly shenanigans if we're unable to
@@ -3,7 +3,13 @@
 """Benchmark/Stress-Test related functionality."""
 from __future__ import annotations
 
+import gc
+import sys
+import time
 import random
+import logging
+import tracemalloc
+from statistics import fmean
 from dataclasses import dataclass
 from typing import TYPE_CHECKING, override
 
@@ -12,7 +18,9 @@ import bascenev1
 import _baclassic
 
 if TYPE_CHECKING:
-    from typing import Any, Sequence
+    from typing import Any, Callable, Sequence
+
+    from bascenev1lib.actor.spazbot import SpazBot, SpazBotSet
 
 
 def run_cpu_benchmark() -> None:
@@ -53,6 +61,504 @@ def run_cpu_benchmark() -> None:
     bascenev1.new_host_session(BenchmarkSession, benchmark_type='cpu')
 
 
+def run_bot_benchmark(
+    bot_types: Sequence[type[SpazBot]] | None = None,
+    bot_count: int = 16,
+    dummy_count: int = 0,
+    duration: float = 60.0,
+    seed: int = 1,
+) -> None:
+    """Measure the cost of bot AI with bots fighting on a fixed map.
+
+    Spawns bot_count bots, cycling through bot_types (a mix of standard
+    bots by default). With no dummies, the bots are split into two sets
+    which fight each other; otherwise they all go after dummy_count
+    scripted (non-bot) spazzes. Anything killed gets replaced so counts
+    stay steady. Random numbers are seeded so runs are repeatable.
+
+    After duration seconds we log time spent per bot-set tick in bot
+    update_ai(), handlemessage() and construction (which is mostly node
+    creation), then return to the main menu.
+    """
+    _run_benchmark_activity(
+        _BotBenchmarkActivity,
+        {
+            'map': 'Courtyard',
+            'bot_types': bot_types,
+            'bot_count': bot_count,
+            'dummy_count': dummy_count,
+            'duration': duration,
+            'seed': seed,
+        },
+    )
+
+
+def _run_benchmark_activity(
+    activitytype: type[bascenev1.Activity], settings: dict
+) -> None:
+    """Run an activity in a bare benchmark session."""
+
+    # Save our UI state that we'll return to when done.
+    if babase.app.classic is not None:
+        babase.app.classic.save_ui_state()
+
+    class ActivityBenchmarkSession(bascenev1.Session):
+        """Session type for activity-based benchmarks."""
+
+        def __init__(self) -> None:
+            depsets: Sequence[bascenev1.DependencySet] = []
+
+            super().__init__(depsets)
+            self.benchmark_type = 'cpu'
+            self.setactivity(bascenev1.newactivity(activitytype, settings))
+
+        @override
+        def on_player_request(self, player: bascenev1.SessionPlayer) -> bool:
+            return False
+
+    bascenev1.new_host_session(ActivityBenchmarkSession, benchmark_type='cpu')
+
+
+def _end_benchmark_activity() -> None:
+    if babase.app.classic is not None:
+        babase.app.classic.return_to_main_menu_session_gracefully(
+            reset_ui=False
+        )
+
+
+@dataclass
+class _BotBenchmarkTimes:
+    update_ai_seconds: float = 0.0
+    handlemessage_seconds: float = 0.0
+    spawn_seconds: float = 0.0
+    spawn_count: int = 0
+    tick_count: int = 0
+    tick_seconds_max: float = 0.0
+    handlemessage_depth: int = 0
+
+
+def _make_timed_bot_type(
+    bot_type: type[SpazBot], times: _BotBenchmarkTimes
+) -> type[SpazBot]:
+    """Return a subclass of a bot type which records its timings."""
+
+    class TimedBot(bot_type):  # type: ignore[valid-type, misc]
+        """Bot which records time spent in its methods."""
+
+        @override
+        def __init__(self) -> None:
+            starttime = time.perf_counter()
+            super().__init__()
+            times.spawn_seconds += time.perf_counter() - starttime
+            times.spawn_count += 1
+
+        @override
+        def update_ai(self) -> None:
+            starttime = time.perf_counter()
+            super().update_ai()
+            times.update_ai_seconds += time.perf_counter() - starttime
+
+        @override
+        def handlemessage(self, msg: Any) -> Any:
+            # Messages often get handled by sending more messages; only
+            # time the outermost call.
+            if times.handlemessage_depth:
+                return super().handlemessage(msg)
+            times.handlemessage_depth += 1
+            starttime = time.perf_counter()
+            try:
+                return super().handlemessage(msg)
+            finally:
+                times.handlemessage_seconds += time.perf_counter() - starttime
+                times.handlemessage_depth -= 1
+
+    TimedBot.__name__ = TimedBot.__qualname__ = bot_type.__name__
+    return TimedBot
+
+
+class _BotBenchmarkActivity(
+    bascenev1.GameActivity[bascenev1.Player, bascenev1.Team]
+):
+    """Has bots fight each other or dummies for run_bot_benchmark()."""
+
+    name = 'Bot Benchmark'
+
+    # How often dummies pick new inputs and killed things get replaced.
+    DUMMY_UPDATE_INTERVAL = 0.5
+    REFILL_INTERVAL = 1.0
+
+    def __init__(self, settings: dict):
+        super().__init__(settings)
+        self._bot_types: Sequence[type[SpazBot]] | None = settings['bot_types']
+        self._bot_count = int(settings['bot_count'])
+        self._dummy_count = int(settings['dummy_count'])
+        self._duration = float(settings['duration'])
+        self._seed = int(settings['seed'])
+        self._random = random.Random(self._seed)
+        self._times = _BotBenchmarkTimes()
+        self._timed_types: list[type[SpazBot]] = []
+        self._bot_sets: list[SpazBotSet] = []
+        self._pending: list[int] = []
+        self._spawned: list[int] = []
+        self._dummies: list[bascenev1.Actor] = []
+        self._timers: list[bascenev1.Timer] = []
+
+    @override
+    def on_begin(self) -> None:
+        # pylint: disable=cyclic-import
+        from bascenev1lib.actor import spazbot
+
+        super().on_begin()
+
+        # Bot AI uses the global random module so seed that too.
+        random.seed(self._seed)
+
+        bot_types = self._bot_types
+        if not bot_types:
+            bot_types = [
+                spazbot.BomberBot,
+                spazbot.BrawlerBot,
+                spazbot.TriggerBot,
+                spazbot.ChargerBot,
+                spazbot.StickyBot,
+            ]
+        self._timed_types = [
+            _make_timed_bot_type(t, self._times) for t in bot_types
+        ]
+
+        # With no dummies, two sets of bots go after each other.
+        # Otherwise a single set goes after the dummies.
+        times = self._times
+
+        class TimedBotSet(spazbot.DemoSpazBotSet):
+            """Bot-set which records how long its ticks take."""
+
+            @override
+            def _update(self) -> None:
+                starttime = time.perf_counter()
+                super()._update()
+                duration = time.perf_counter() - starttime
+                times.tick_count += 1
+                times.tick_seconds_max = max(times.tick_seconds_max, duration)
+
+        set_count = 1 if self._dummy_count else 2
+        self._bot_sets = [TimedBotSet() for _ in range(set_count)]
+        self._pending = [0] * set_count
+        self._spawned = [0] * set_count
+        self._refill()
+
+        self._timers = [
+            bascenev1.Timer(
+                self.REFILL_INTERVAL,
+                bascenev1.WeakCallStrict(self._refill),
+                repeat=True,
+            ),
+            bascenev1.Timer(
+                self.DUMMY_UPDATE_INTERVAL,
+                bascenev1.WeakCallStrict(self._update_dummies),
+                repeat=True,
+            ),
+            bascenev1.Timer(
+                self._duration, bascenev1.WeakCallStrict(self._report)
+            ),
+        ]
+
+    def _refill(self) -> None:
+        set_count = len(self._bot_sets)
+        for i, bot_set in enumerate(self._bot_sets):
+            wanted = self._bot_count // set_count + (
+                1 if i < self._bot_count % set_count else 0
+            )
+            missing = wanted - len(bot_set.get_living_bots()) - self._pending[i]
+            for _j in range(max(0, missing)):
+                self._spawn_bot(i)
+
+        self._dummies = [d for d in self._dummies if d.is_alive()]
+        while len(self._dummies) < self._dummy_count:
+            self._spawn_dummy()
+
+    def _spawn_point(self, side: float) -> tuple[float, float, float]:
+        return (
+            side * 4.0 + self._random.uniform(-1.5, 1.5),
+            3.0,
+            self._random.uniform(-5.0, 1.0),
+        )
+
+    def _spawn_bot(self, set_index: int) -> None:
+        bot_type = self._timed_types[
+            self._spawned[set_index] % len(self._timed_types)
+        ]
+        self._spawned[set_index] += 1
+        self._pending[set_index] += 1
+        self._bot_sets[set_index].spawn_bot(
+            bot_type,
+            pos=self._spawn_point(-1.0 if set_index else 1.0),
+            spawn_time=0.5,
+            on_spawn_call=babase.CallPartial(self._on_bot_spawned, set_index),
+        )
+
+    def _on_bot_spawned(self, set_index: int, _bot: SpazBot) -> None:
+        self._pending[set_index] -= 1
+
+    def _spawn_dummy(self) -> None:
+        # pylint: disable=cyclic-import
+        from bascenev1lib.actor.spaz import Spaz
+
+        dummy = Spaz(
+            color=(0.5, 0.5, 1.0),
+            character='Spaz',
+            start_invincible=False,
+            can_accept_powerups=False,
+        )
+        dummy.handlemessage(
+            bascenev1.StandMessage(
+                self._spawn_point(-1.0), self._random.uniform(0, 360)
+            )
+        )
+        self._dummies.append(dummy)
+
+    def _update_dummies(self) -> None:
+        # Wander around and throw the occasional punch.
+        for dummy in self._dummies:
+            node = getattr(dummy, 'node', None)
+            if not dummy.is_alive() or not node:
+                continue
+            node.move_left_right = self._random.uniform(-1.0, 1.0)
+            node.move_up_down = self._random.uniform(-1.0, 1.0)
+            if self._random.random() < 0.3:
+                node.punch_pressed = True
+                node.punch_pressed = False
+
+    def _report(self) -> None:
+        self._timers = []
+        times = self._times
+        ticks = max(1, times.tick_count)
+        summary = (
+            f'Bot benchmark: {times.tick_count} bot-set ticks over'
+            f' {self._duration:.0f}s; per tick: update_ai'
+            f' {times.update_ai_seconds / ticks * 1000.0:.3f}ms,'
+            f' handlemessage'
+            f' {times.handlemessage_seconds / ticks * 1000.0:.3f}ms,'
+            f' construction {times.spawn_seconds / ticks * 1000.0:.3f}ms'
+            f' ({times.spawn_count} bots spawned); slowest tick'
+            f' {times.tick_seconds_max * 1000.0:.3f}ms.'
+        )
+        logging.info(summary)
+        babase.screenmessage(summary)
+        _end_benchmark_activity()
+
+
+def run_bot_pool_benchmark(
+    wave_count: int = 8, wave_size: int = 20, seed: int = 1
+) -> None:
+    """Compare spawning waves of bots with and without pooling.
+
+    Runs the same seeded waves of bots on a fixed map twice; first with
+    a plain bot-set and then with one that pools retired bots (see
+    bascenev1lib.actor.spazbot.SpazBotSet). For each wave we log the
+    memory blocks and bytes left allocated by spawning its bots
+    (sys.getallocatedblocks() and tracemalloc deltas around each spawn)
+    and the time spent in gc passes, both automatic ones while the wave
+    was alive and a full pass after it is killed. Averages for both runs
+    leave out the first wave, since pools start out empty.
+    """
+    _run_benchmark_activity(
+        _BotPoolBenchmarkActivity,
+        {
+            'map': 'Courtyard',
+            'wave_count': wave_count,
+            'wave_size': wave_size,
+            'seed': seed,
+        },
+    )
+
+
+@dataclass
+class _BotWaveResult:
+    spawn_blocks: int = 0
+    spawn_bytes: int = 0
+    pooled_spawns: int = 0
+    gc_passes: int = 0
+    gc_pass_seconds: float = 0.0
+    full_gc_seconds: float = 0.0
+    full_gc_objects: int = 0
+
+
+class _BotPoolBenchmarkActivity(
+    bascenev1.GameActivity[bascenev1.Player, bascenev1.Team]
+):
+    """Spawns and kills waves of bots for run_bot_pool_benchmark()."""
+
+    name = 'Bot Pool Benchmark'
+
+    # How long each wave stays alive and how long we wait between them
+    # (which gives bombs and such left over from a wave time to die).
+    WAVE_DURATION = 3.0
+    WAVE_INTERVAL = 2.0
+
+    def __init__(self, settings: dict):
+        super().__init__(settings)
+        self._wave_count = max(2, int(settings['wave_count']))
+        self._wave_size = int(settings['wave_size'])
+        self._seed = int(settings['seed'])
+        self._random = random.Random(self._seed)
+        self._bot_types: list[type[SpazBot]] = []
+        self._bots: SpazBotSet | None = None
+        self._pooled = False
+        self._wave: _BotWaveResult | None = None
+        self._gc_pass_start: float | None = None
+        self._results: dict[bool, list[_BotWaveResult]] = {
+            False: [],
+            True: [],
+        }
+        self._started_tracemalloc = False
+
+    @override
+    def on_begin(self) -> None:
+        super().on_begin()
+
+        # Spawns get measured with tracemalloc, so make sure it's on.
+        if not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self._started_tracemalloc = True
+        gc.callbacks.append(self._on_gc)
+        self._start_run(pooled=False)
+
+    @override
+    def on_expire(self) -> None:
+        super().on_expire()
+        if self._on_gc in gc.callbacks:
+            gc.callbacks.remove(self._on_gc)
+        if self._started_tracemalloc:
+            tracemalloc.stop()
+            self._started_tracemalloc = False
+
+    def _on_gc(self, phase: str, _info: dict[str, int]) -> None:
+        if phase == 'start':
+            self._gc_pass_start = time.perf_counter()
+        elif self._gc_pass_start is not None:
+            if self._wave is not None:
+                self._wave.gc_passes += 1
+                self._wave.gc_pass_seconds += (
+                    time.perf_counter() - self._gc_pass_start
+                )
+            self._gc_pass_start = None
+
+    def _start_run(self, pooled: bool) -> None:
+        # pylint: disable=cyclic-import
+        from bascenev1lib.actor import spazbot
+
+        self._bot_types = [
+            spazbot.BomberBot,
+            spazbot.BrawlerBot,
+            spazbot.TriggerBot,
+            spazbot.ChargerBot,
+            spazbot.StickyBot,
+        ]
+        results = self._results
+
+        class MeasuredBotSet(spazbot.SpazBotSet):
+            """Bot-set which records what its spawns leave allocated."""
+
+            @override
+            def _spawn_bot(
+                self,
+                bot_type: type[SpazBot],
+                pos: Sequence[float],
+                on_spawn_call: Callable[[SpazBot], Any] | None,
+            ) -> None:
+                blocks = sys.getallocatedblocks()
+                nbytes = tracemalloc.get_traced_memory()[0]
+                super()._spawn_bot(bot_type, pos, on_spawn_call)
+                wave = results[pooled][-1]
+                wave.spawn_blocks += sys.getallocatedblocks() - blocks
+                wave.spawn_bytes += tracemalloc.get_traced_memory()[0] - nbytes
+
+        self._pooled = pooled
+        self._bots = MeasuredBotSet(pool_size=self._wave_size if pooled else 0)
+
+        # Both runs get identical waves (bot AI uses the global random
+        # module so seed that too).
+        self._random = random.Random(self._seed)
+        random.seed(self._seed)
+        gc.collect()
+        self._spawn_wave()
+
+    def _spawn_wave(self) -> None:
+        assert self._bots is not None
+        self._wave = _BotWaveResult()
+        self._results[self._pooled].append(self._wave)
+        for i in range(self._wave_size):
+            self._bots.spawn_bot(
+                self._bot_types[i % len(self._bot_types)],
+                pos=(
+                    self._random.uniform(-5.0, 5.0),
+                    3.0,
+                    self._random.uniform(-6.0, 2.0),
+                ),
+                spawn_time=0.1,
+            )
+        bascenev1.timer(self.WAVE_DURATION, self._kill_wave)
+
+    def _kill_wave(self) -> None:
+        assert self._bots is not None and self._wave is not None
+        wave = self._wave
+        self._wave = None
+        stats = self._bots.get_stats()
+        wave.pooled_spawns = stats.pooled_spawns - sum(
+            w.pooled_spawns for w in self._results[self._pooled]
+        )
+        self._bots.clear()
+
+        starttime = time.perf_counter()
+        wave.full_gc_objects = gc.collect()
+        wave.full_gc_seconds = time.perf_counter() - starttime
+        logging.info(
+            'Bot pool benchmark (%s) wave %d: spawns left %d blocks'
+            ' (%d bytes) allocated; %d of %d bots recycled; %d gc passes'
+            ' took %.2fms; full gc pass took %.2fms (%d objects).',
+            'pooled' if self._pooled else 'unpooled',
+            len(self._results[self._pooled]),
+            wave.spawn_blocks,
+            wave.spawn_bytes,
+            wave.pooled_spawns,
+            self._wave_size,
+            wave.gc_passes,
+            wave.gc_pass_seconds * 1000.0,
+            wave.full_gc_seconds * 1000.0,
+            wave.full_gc_objects,
+        )
+
+        if len(self._results[self._pooled]) < self._wave_count:
+            bascenev1.timer(self.WAVE_INTERVAL, self._spawn_wave)
+        elif not self._pooled:
+            bascenev1.timer(
+                self.WAVE_INTERVAL, babase.CallStrict(self._start_run, True)
+            )
+        else:
+            self._report()
+
+    def _report(self) -> None:
+        for pooled in (False, True):
+            results = self._results[pooled][1:]
+            gc_ms = fmean([r.gc_pass_seconds for r in results]) * 1000.0
+            full_gc_ms = fmean([r.full_gc_seconds for r in results]) * 1000.0
+            summary = (
+                f'Bot pool benchmark ({"pooled" if pooled else "unpooled"}):'
+                f' per wave, spawns left'
+                f' {fmean([r.spawn_blocks for r in results]):.0f} blocks'
+                f' ({fmean([r.spawn_bytes for r in results]):.0f} bytes)'
+                f' allocated;'
+                f' {fmean([r.pooled_spawns for r in results]):.1f} of'
+                f' {self._wave_size} bots recycled; gc passes took'
+                f' {gc_ms:.2f}ms; full gc pass took {full_gc_ms:.2f}ms'
+                f' ({fmean([r.full_gc_objects for r in results]):.0f} objects).'
+            )
+            logging.info(summary)
+            babase.screenmessage(summary)
+        _end_benchmark_activity()
+
+
 @dataclass
 class _StressTestArgs:
     playlist_type: str
@@ -0,0 +1,229 @@
+# Released under the MIT License. See LICENSE for details.
+#
+"""Persistent player statistics for servers."""
+from __future__ import annotations
+
+import time
+import queue
+import asyncio
+import logging
+import threading
+from dataclasses import dataclass
+from typing import TYPE_CHECKING
+
+from bacommon.servermanager import PlayerStats
+import babase
+
+if TYPE_CHECKING:
+    import sqlite3
+
+
+@dataclass
+class PlayerGameResult:
+    """How a single account did in a single game."""
+
+    account_id: str
+    name: str
+    score: int
+    kills: int
+    deaths: int
+    won: bool
+
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS players (
+    account_id TEXT PRIMARY KEY,
+    name TEXT NOT NULL,
+    score INTEGER NOT NULL DEFAULT 0,
+    kills INTEGER NOT NULL DEFAULT 0,
+    deaths INTEGER NOT NULL DEFAULT 0,
+    games INTEGER NOT NULL DEFAULT 0,
+    wins INTEGER NOT NULL DEFAULT 0,
+    last_seen REAL NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS players_by_score ON players (score DESC);
+CREATE INDEX IF NOT EXISTS players_by_kills ON players (kills DESC);
+CREATE INDEX IF NOT EXISTS players_by_wins ON players (wins DESC);
+CREATE INDEX IF NOT EXISTS players_by_games ON players (games DESC);
+CREATE TABLE IF NOT EXISTS results (
+    id INTEGER PRIMARY KEY,
+    account_id TEXT NOT NULL,
+    game TEXT NOT NULL,
+    time REAL NOT NULL,
+    score INTEGER NOT NULL,
+    kills INTEGER NOT NULL,
+    deaths INTEGER NOT NULL,
+    won INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS results_by_account ON results (account_id, time);
+"""
+
+_PLAYER_COLUMNS = (
+    'account_id, name, score, kills, deaths, games, wins, last_seen'
+)
+
+
+class StatsStore:
+    """Persistent player statistics keyed by v1 account id.
+
+    Stats live in a SQLite database. Writes are queued up and applied
+    in batches by a background thread, so recording results never
+    touches the disk on the logic thread. Reads use a separate
+    connection and indexes on the columns we sort by, so leaderboard
+    queries stay fast no matter how many players we've seen.
+
+    Raises an ImportError if sqlite3 is not available.
+    """
+
+    #: Columns top-N queries can be ordered by.
+    ORDER_COLUMNS = ('score', 'kills', 'wins', 'games')
+
+    # How long the writer waits for more results before writing a batch.
+    BATCH_DELAY = 1.0
+
+    def __init__(self, path: str) -> None:
+        import sqlite3
+
+        self._path = path
+        self._queue: queue.Queue[
+            tuple[str, float, list[PlayerGameResult]] | None
+        ] = queue.Queue()
+
+        # Set up our schema and read connection here so any problems
+        # show up immediately.
+        self._read_conn: sqlite3.Connection = self._connect()
+        with self._read_conn:
+            self._read_conn.executescript(_SCHEMA)
+
+        self._writer_done = threading.Event()
+        self._writer = threading.Thread(
+            target=self._writer_main, name='stats-writer', daemon=True
+        )
+        self._writer.start()
+        babase.app.add_shutdown_task(self._shutdown())
+
+    def record_game(self, game: str, results: list[PlayerGameResult]) -> None:
+        """Queue results from a finished game to be written."""
+        if results:
+            self._queue.put((game, time.time(), results))
+
+    def get_top(self, count: int, order: str = 'score') -> list[PlayerStats]:
+        """Return the top players by a column in ORDER_COLUMNS."""
+        if order not in self.ORDER_COLUMNS:
+            raise ValueError(
+                f'Invalid order "{order}"; expected one of'
+                f' {self.ORDER_COLUMNS}.'
+            )
+        rows = self._read_conn.execute(
+            f'SELECT {_PLAYER_COLUMNS} FROM players'
+            f' ORDER BY {order} DESC LIMIT ?',
+            (count,),
+        ).fetchall()
+        return [PlayerStats(*row) for row in rows]
+
+    def get_player(self, account_id: str) -> PlayerStats | None:
+        """Return stats for an account (None if we haven't seen it)."""
+        row = self._read_conn.execute(
+            f'SELECT {_PLAYER_COLUMNS} FROM players WHERE account_id = ?',
+            (account_id,),
+        ).fetchone()
+        return None if row is None else PlayerStats(*row)
+
+    def _connect(self) -> sqlite3.Connection:
+        import sqlite3
+
+        conn = sqlite3.connect(self._path, timeout=10.0)
+
+        # WAL lets our reads proceed while the writer is writing.
+        conn.execute('PRAGMA journal_mode=WAL')
+        conn.execute('PRAGMA synchronous=NORMAL')
+        return conn
+
+    async def _shutdown(self) -> None:
+        self._queue.put(None)
+        while not self._writer_done.is_set():
+            await asyncio.sleep(0.05)
+
+    def _writer_main(self) -> None:
+        try:
+            conn = self._connect()
+        except Exception:
+            logging.exception('Error opening stats db %s.', self._path)
+            self._writer_done.set()
+            return
+        done = False
+        while not done:
+            item = self._queue.get()
+            if item is None:
+                break
+
+            # Gather up anything else that arrives shortly after so we
+            # write it all in a single transaction.
+            batch = [item]
+            deadline = time.monotonic() + self.BATCH_DELAY
+            while True:
+                try:
+                    item = self._queue.get(
+                        timeout=max(0.0, deadline - time.monotonic())
+                    )
+                except queue.Empty:
+                    break
+                if item is None:
+                    done = True
+                    break
+                batch.append(item)
+            try:
+                self._write_batch(conn, batch)
+            except Exception:
+                logging.exception('Error writing stats to %s.', self._path)
+        conn.close()
+        self._writer_done.set()
+
+    def _write_batch(
+        self,
+        conn: sqlite3.Connection,
+        batch: list[tuple[str, float, list[PlayerGameResult]]],
+    ) -> None:
+        with conn:
+            for game, gametime, results in batch:
+                conn.executemany(
+                    'INSERT INTO results (account_id, game, time, score,'
+                    ' kills, deaths, won) VALUES (?, ?, ?, ?, ?, ?, ?)',
+                    [
+                        (
+                            res.account_id,
+                            game,
+                            gametime,
+                            res.score,
+                            res.kills,
+                            res.deaths,
+                            int(res.won),
+                        )
+                        for res in results
+                    ],
+                )
+                conn.executemany(
+                    'INSERT INTO players (account_id, name, score, kills,'
+                    ' deaths, games, wins, last_seen)'
+                    ' VALUES (?, ?, ?, ?, ?, 1, ?, ?)'
+                    ' ON CONFLICT (account_id) DO UPDATE SET'
+                    ' name = excluded.name,'
+                    ' score = score + excluded.score,'
+                    ' kills = kills + excluded.kills,'
+                    ' deaths = deaths + excluded.deaths,'
+                    ' games = games + 1,'
+                    ' wins = wins + excluded.wins,'
+                    ' last_seen = excluded.last_seen',
+                    [
+                        (
+                            res.account_id,
+                            res.name,
+                            res.score,
+                            res.kills,
+                            res.deaths,
+                            int(res.won),
+                            gametime,
+                        )
+                        for res in results
+                    ],
+                )
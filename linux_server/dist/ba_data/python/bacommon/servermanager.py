@@ -5,14 +5,34 @@ from __future__ import annotations
 
 from enum import Enum
 from dataclasses import field, dataclass
-from typing import TYPE_CHECKING, Any
+from typing import TYPE_CHECKING, Any, Annotated
 
-from efro.dataclassio import ioprepped
+from efro.dataclassio import ioprepped, IOAttrs
 
 if TYPE_CHECKING:
     pass
 
 
+@ioprepped
+@dataclass
+class ServerInstanceConfig:
+    """Config for one server subprocess in a multi-instance setup."""
+
+    # Unique name for this instance. This is used to label output and
+    # to address commands to a particular instance.
+    name: str
+
+    # Ballistica root directory for this instance. Each instance needs
+    # its own. If not provided, a directory alongside the server
+    # manager's root dir will be used ('<root>_<name>').
+    ba_root: str | None = None
+
+    # Values overriding those in the top level config for this
+    # instance. Keys and values are the same as in the top level config
+    # (port, party_name, session_type, etc.)
+    config: dict[str, Any] = field(default_factory=dict)
+
+
 @ioprepped
 @dataclass
 class ServerConfig:
@@ -96,6 +116,20 @@ class ServerConfig:
     # order.
     playlist_shuffle: bool = True
 
+    # How games are picked when playlist_shuffle is on. 'classic' just
+    # avoids repeating the previous game's map or type where it can.
+    # 'weighted' picks entries in proportion to an optional 'weight'
+    # value on each (default 1), avoids any map or game type used in
+    # the last playlist_no_repeat_window games where it can, and skips
+    # entries whose optional 'min_players'/'max_players' values don't
+    # fit the current player count.
+    playlist_scheduler: str = 'classic'
+    playlist_no_repeat_window: int = 2
+
+    # Seed for the 'weighted' scheduler's picks; set this to get the
+    # same order of games every time (handy for testing playlists).
+    playlist_seed: int | None = None
+
     # If True, keeps team sizes equal by disallowing joining the largest
     # team (teams mode only).
     auto_balance_teams: bool = True
@@ -150,12 +184,41 @@ class ServerConfig:
     # server subprocess if auto-restart is enabled (the default).
     unclean_exit_minutes: float | None = None
 
+    # After a server subprocess exits uncleanly, the server manager
+    # waits this many seconds before launching a new one. The wait
+    # doubles with each consecutive unclean exit (up to
+    # unclean_restart_delay_max seconds) so a server that keeps crashing
+    # doesn't hog the machine.
+    unclean_restart_delay: float = 5.0
+    unclean_restart_delay_max: float = 300.0
+
+    # If a server subprocess exits uncleanly this many times within
+    # crash_loop_window_minutes, the server manager gives up on
+    # restarting it (and exits with an error code once no other servers
+    # are running). A subprocess staying up that long also resets the
+    # restart delay above. Set to 0 to never give up.
+    crash_loop_max_exits: int = 10
+    crash_loop_window_minutes: float = 10.0
+
+    # If True, info about each unclean exit of a server subprocess is
+    # saved to a timestamped directory under 'crashes' in its ba_root.
+    # This includes any app-state dumps (Python stack traces, etc.) the
+    # server left behind, and stack traces grabbed from servers that
+    # had to be force-killed.
+    save_crash_info: bool = True
+
     # If present, the server subprocess will shut down immediately if
     # this amount of time passes with no activity from any players. The
     # server manager will then spin up a fresh server subprocess if
     # auto-restart is enabled (the default).
     idle_exit_minutes: float | None = None
 
+    # If present, once this many seconds pass with no clients connected
+    # the server pauses its current game (stopping its timers and
+    # physics) and checks its own health less often until a client
+    # connects again.
+    idle_pause_seconds: float | None = None
+
     # Should the tutorial be shown at the beginning of games?
     show_tutorial: bool = False
 
@@ -200,6 +263,103 @@ class ServerConfig:
     # modules on demand could cause visual hitches.
     dont_write_bytecode: bool = False
 
+    # If True, the server keeps a report on each activity it runs: how
+    # much memory was allocated over its lifetime and where, what actors
+    # and nodes were still around when it ended, and whether it was
+    # freed properly afterwards. This is useful for tracking down which
+    # game is leaking, but uses Python's tracemalloc module which makes
+    # everything noticeably slower and hungrier, so leave it off
+    # normally. Reports can be fetched with mgr.get_activity_reports().
+    activity_accounting: bool = False
+
+    # If True, the server keeps persistent stats for each player account
+    # (score, kills, deaths, games played and won, plus per-game
+    # results) in 'stats.sqlite' in its ba_root. These survive series
+    # ends and restarts and can be fetched with mgr.get_top_stats() and
+    # mgr.get_player_stats(). Players not signed in to an account are
+    # not recorded.
+    persistent_stats: bool = False
+
+    # If True, the server manager keeps a second server process launched
+    # and warmed up (but not yet hosting) alongside the active one. When
+    # the active process exits, the standby takes over its port within a
+    # second or so instead of a fresh process having to start from
+    # scratch, so restarts (such as from clean_exit_minutes) no longer
+    # empty the server. This costs the memory of an extra process. The
+    # standby uses '<ba_root>_standby' as its config dir (the two swap
+    # roles on each takeover); bans and stats stay in ba_root.
+    warm_standby: bool = False
+
+    # If set, the server manager serves health metrics for itself and
+    # its server subprocesses in Prometheus text format at
+    # http://127.0.0.1:METRICS_PORT/metrics. Changes to this value take
+    # effect when the server manager restarts.
+    metrics_port: int | None = None
+
+    # Run multiple server subprocesses from a single server manager. Each
+    # entry inherits all of the values above but can override any of
+    # them (at the very least each instance will need its own port).
+    # Leave this unset to run a single server the classic way.
+    instances: list[ServerInstanceConfig] | None = None
+
+
+# ServerConfig fields which a running server can apply without needing
+# a restart (see UpdateConfigCommand). Changes to any other fields
+# (port, session_type, etc.) require a fresh server process.
+LIVE_CONFIG_FIELDS = frozenset(
+    [
+        'party_name',
+        'party_is_public',
+        'authenticate_clients',
+        'admins',
+        'enable_default_kick_voting',
+        'public_ipv4_address',
+        'public_ipv6_address',
+        'max_party_size',
+        'session_max_players_override',
+        'stats_url',
+        'enable_queue',
+        'player_rejoin_cooldown',
+        'log_levels',
+        'activity_accounting',
+        'idle_pause_seconds',
+    ]
+)
+
+
+@ioprepped
+@dataclass
+class BanEntry:
+    """A ban on an account and/or a client spec.
+
+    A player is banned if either their v1 account id or their client's
+    spec string matches.
+    """
+
+    account_id: Annotated[str | None, IOAttrs('a')] = None
+    spec: Annotated[str | None, IOAttrs('s')] = None
+
+    # When the ban expires (time.time()); None means never.
+    expire_time: Annotated[float | None, IOAttrs('e')] = None
+
+    reason: Annotated[str, IOAttrs('r', store_default=False)] = ''
+    create_time: Annotated[float, IOAttrs('c')] = 0.0
+
+
+@ioprepped
+@dataclass
+class BanList:
+    """A list of bans (this is what gets stored on disk)."""
+
+    entries: Annotated[list[BanEntry], IOAttrs('entries')] = field(
+        default_factory=list
+    )
+
+
+# File (in a server's ba_root) its Python stack traces get written to
+# when the server manager sends it SIGUSR1.
+STACK_DUMP_FILE_NAME = '_server_stack_dump'
+
 
 # NOTE: as much as possible, communication from the server-manager to
 # the child-process should go through these and not ad-hoc Python string
@@ -208,12 +368,40 @@ class ServerCommand:
     """Base class for commands that can be sent to the server."""
 
 
+class ServerCommandResponse:
+    """Base class for responses to commands sent to the server.
+
+    Responses are only available for commands sent through the command
+    channel; commands sent through stdin get none.
+    """
+
+
+@dataclass
+class CommandAckResponse(ServerCommandResponse):
+    """Response for a command which succeeded and has nothing to say."""
+
+
+@dataclass
+class CommandErrorResponse(ServerCommandResponse):
+    """Response for a command which errored on the server."""
+
+    error: str
+
+
 @dataclass
 class StartServerModeCommand(ServerCommand):
     """Tells the app to switch into 'server' mode."""
 
     config: ServerConfig
 
+    # If provided, the app will connect to a unix domain socket at this
+    # path to receive further commands and send back responses.
+    command_socket_path: str | None = None
+
+    # If provided, persistent server data (bans, stats, etc.) is kept
+    # in this directory instead of the app's config dir.
+    data_dir: str | None = None
+
 
 class ShutdownReason(Enum):
     """Reason a server is shutting down."""
@@ -249,7 +437,61 @@ class ScreenMessageCommand(ServerCommand):
 
 @dataclass
 class ClientListCommand(ServerCommand):
-    """Print a list of clients."""
+    """Get a list of clients (responds with a ClientListResponse).
+
+    When sent through stdin, the list is printed instead.
+    """
+
+
+@dataclass
+class ClientInfo:
+    """Info about a client connected to the server."""
+
+    client_id: int
+    account_name: str
+    players: list[str]
+
+    # When the server first saw this client (time.time()).
+    join_time: float
+
+
+@dataclass
+class ClientListResponse(ServerCommandResponse):
+    """The clients connected to the server."""
+
+    clients: list[ClientInfo]
+
+
+@dataclass
+class RosterCommand(ServerCommand):
+    """Get the client roster (responds with a RosterResponse).
+
+    If since_version and roster_id from an earlier response are passed,
+    the response only contains what changed since then where possible.
+    This keeps frequent polling cheap.
+    """
+
+    since_version: int | None = None
+    roster_id: str | None = None
+
+
+@dataclass
+class RosterResponse(ServerCommandResponse):
+    """The client roster, or changes to it."""
+
+    # Pass these back next time to get only newer changes. The id is
+    # unique to each server process; versions from one mean nothing to
+    # another.
+    version: int
+    roster_id: str
+
+    # If True, clients is the complete roster. Otherwise it only holds
+    # clients that joined or changed (players joining/leaving, etc.)
+    # since the requested version, and removed holds ids of clients
+    # that left.
+    full: bool
+    clients: list[ClientInfo]
+    removed: list[int]
 
 
 @dataclass
@@ -258,3 +500,281 @@ class KickCommand(ServerCommand):
 
     client_id: int
     ban_time: int | None
+
+
+@dataclass
+class UpdateConfigCommand(ServerCommand):
+    """Apply new values for config fields in a running server.
+
+    Only fields in LIVE_CONFIG_FIELDS can be updated this way.
+    """
+
+    values: dict[str, Any]
+
+
+@dataclass
+class ExecCommand(ServerCommand):
+    """Exec a Python statement in the server."""
+
+    statement: str
+
+
+@dataclass
+class BatchCommand(ServerCommand):
+    """Run a list of commands in order (responds with a BatchResponse).
+
+    An error in one command does not prevent the rest from running.
+    """
+
+    commands: list[ServerCommand]
+
+
+@dataclass
+class BatchResponse(ServerCommandResponse):
+    """Responses for each command in a BatchCommand."""
+
+    responses: list[ServerCommandResponse]
+
+
+@dataclass
+class BanCommand(ServerCommand):
+    """Ban an account and/or client spec.
+
+    duration is in seconds; None bans permanently.
+    """
+
+    account_id: str | None
+    spec: str | None
+    duration: float | None
+    reason: str = ''
+
+
+@dataclass
+class UnbanCommand(ServerCommand):
+    """Remove any bans on an account and/or client spec."""
+
+    account_id: str | None
+    spec: str | None
+
+
+@dataclass
+class BanListCommand(ServerCommand):
+    """Get all current bans (responds with a BanListResponse)."""
+
+
+@dataclass
+class BanListResponse(ServerCommandResponse):
+    """All current bans."""
+
+    entries: list[BanEntry]
+
+
+@dataclass
+class ImportBansCommand(ServerCommand):
+    """Add a batch of bans in one go.
+
+    If replace is True, all existing bans are removed first.
+    """
+
+    entries: list[BanEntry]
+    replace: bool = False
+
+
+@dataclass
+class MetricsCommand(ServerCommand):
+    """Request health metrics (responds with a MetricsResponse)."""
+
+
+@dataclass
+class ServerMetrics:
+    """Health metrics for a running server.
+
+    These are sampled periodically by the server so fetching them never
+    costs the game anything; they can be a second or so old.
+    """
+
+    client_count: int
+    player_count: int
+
+    # Type name of the current foreground activity, if any.
+    activity: str | None
+
+    # We can't see logic-thread frame times directly from Python, so
+    # we measure how late a short repeating timer on the logic thread
+    # fires instead. Long frames show up as lag here. These cover the
+    # most recent sampling window.
+    logic_lag_avg: float
+    logic_lag_max: float
+
+    # Explicit garbage-collection passes run by the app.
+    gc_pass_count: int
+    gc_pass_seconds_total: float
+    gc_pass_seconds_last: float | None
+
+    # Young-generation passes run during gameplay (only in incremental
+    # gc mode).
+    gc_incremental_pass_count: int
+    gc_incremental_pass_seconds_total: float
+
+    # Counts of all gc passes by duration. Each count covers passes up
+    # to the matching bound in seconds; the final count is for passes
+    # longer than the last bound.
+    gc_pause_bounds: list[float]
+    gc_pause_counts: list[int]
+
+    # Games which began with their media prefetched vs. ones which
+    # began before prefetching finished.
+    prefetch_hits: int
+    prefetch_misses: int
+
+    # Particle effects emitted vs. dropped by effect budgets (see
+    # bascenev1.EffectBudget).
+    effects_emitted: int
+    effects_suppressed: int
+
+    # Whether the server is idling (see idle_pause_seconds).
+    idle: bool
+
+
+@dataclass
+class MetricsResponse(ServerCommandResponse):
+    """Health metrics from the server (None if not yet sampled)."""
+
+    metrics: ServerMetrics | None
+
+
+@dataclass
+class GamePortCommand(ServerCommand):
+    """Get the port being hosted on (responds with a GamePortResponse)."""
+
+
+@dataclass
+class GamePortResponse(ServerCommandResponse):
+    """The port the server is hosting on."""
+
+    port: int
+
+
+@dataclass
+class PlayerStats:
+    """Persistent stats for a player account."""
+
+    account_id: str
+
+    # Name the account most recently played under.
+    name: str
+
+    score: int
+    kills: int
+    deaths: int
+    games: int
+    wins: int
+
+    # When the account last finished a game (time.time()).
+    last_seen: float
+
+
+@dataclass
+class TopStatsCommand(ServerCommand):
+    """Get top players (responds with a TopStatsResponse).
+
+    Order can be 'score', 'kills', 'wins', or 'games'.
+    """
+
+    count: int = 10
+    order: str = 'score'
+
+
+@dataclass
+class TopStatsResponse(ServerCommandResponse):
+    """Top players, best first."""
+
+    entries: list[PlayerStats]
+
+
+@dataclass
+class PlayerStatsCommand(ServerCommand):
+    """Get stats for an account (responds with a PlayerStatsResponse)."""
+
+    account_id: str
+
+
+@dataclass
+class PlayerStatsResponse(ServerCommandResponse):
+    """Stats for an account (None if it has none)."""
+
+    stats: PlayerStats | None
+
+
+@dataclass
+class ActivityReportsCommand(ServerCommand):
+    """Get reports on recent activities (see activity_accounting).
+
+    Responds with an ActivityReportsResponse.
+    """
+
+
+@dataclass
+class AllocationSite:
+    """A source location and how its allocations changed."""
+
+    location: str
+    size_delta: int
+    count_delta: int
+
+
+@dataclass
+class ActivityReport:
+    """Memory and object-lifetime info for a single activity."""
+
+    # Full type name of the activity.
+    activity: str
+
+    # When the activity transitioned in and was expired (time.time()).
+    begin_time: float
+    end_time: float | None = None
+
+    # Change in total traced memory (in bytes) between the activity
+    # transitioning in and expiring, and the locations contributing
+    # most to it. These are None/empty until calculated (which happens
+    # in the background).
+    memory_delta: int | None = None
+    top_sites: list[AllocationSite] = field(default_factory=list)
+
+    # Counts by type of actors and nodes still alive as the activity
+    # was expired.
+    actors: dict[str, int] = field(default_factory=dict)
+    nodes: dict[str, int] = field(default_factory=dict)
+
+    # Whether the activity has been freed since expiring. If not, this
+    # counts how many times it has been flagged as not dying and lists
+    # its actors still alive as of the most recent of those.
+    freed: bool = False
+    stuck_warnings: int = 0
+    stuck_actors: dict[str, int] = field(default_factory=dict)
+
+
+@dataclass
+class ActivityReportsResponse(ServerCommandResponse):
+    """Reports on recent activities (oldest first)."""
+
+    reports: list[ActivityReport]
+
+
+def client_list_str(clients: list[ClientInfo]) -> str:
+    """Return a human readable table for a list of clients."""
+    from efro.terminal import Clr
+
+    title1 = 'Client ID'
+    title2 = 'Account Name'
+    title3 = 'Players'
+    col1 = 10
+    col2 = 16
+    out = f'{Clr.BLD}{title1:<{col1}} {title2:<{col2}} {title3}{Clr.RST}'
+    for client in clients:
+        players = ', '.join(client.players)
+        out += (
+            f'\n{client.client_id:<{col1}}'
+            f' {client.account_name:<{col2}} {players}'
+        )
+    return out
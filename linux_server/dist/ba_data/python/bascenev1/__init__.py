@@ -156,6 +156,12 @@ from _bascenev1 import (
     timer,
     Timer,
 )
+from bascenev1._accounting import ActivityAccounting
+from bascenev1._prefetch import (
+    AssetPrefetcher,
+    PrefetchCounts,
+    get_prefetch_counts,
+)
 from bascenev1._activity import Activity
 from bascenev1._activitytypes import JoinActivity, ScoreScreenActivity
 from bascenev1._actor import Actor
@@ -171,6 +177,11 @@ from bascenev1._dependency import (
     AssetPackage,
 )
 from bascenev1._dualteamsession import DualTeamSession
+from bascenev1._effectbudget import (
+    EffectBudget,
+    EffectCounts,
+    get_effect_counts,
+)
 from bascenev1._freeforallsession import FreeForAllSession
 from bascenev1._gameactivity import GameActivity
 from bascenev1._gameresults import GameResults, WinnerGroup
@@ -231,6 +242,12 @@ from bascenev1._playlist import (
     get_default_free_for_all_playlist,
     get_default_teams_playlist,
     filter_playlist,
+    compile_playlist,
+    get_playlist_hash,
+)
+from bascenev1._playlistscheduler import (
+    WeightedShuffleList,
+    set_playlist_scheduler,
 )
 from bascenev1._powerup import PowerupMessage, PowerupAcceptMessage
 from bascenev1._score import ScoreType, ScoreConfig
@@ -248,12 +265,20 @@ from bascenev1._session import (
     set_player_rejoin_cooldown,
     set_max_players_override,
 )
-from bascenev1._stats import PlayerScoredMessage, PlayerRecord, Stats
+from bascenev1._stats import (
+    AccountGameStats,
+    PlayerScoredMessage,
+    PlayerRecord,
+    Stats,
+)
 from bascenev1._team import SessionTeam, Team, EmptyTeam
 from bascenev1._teamgame import TeamGameActivity
+from bascenev1._timingwheel import TimingWheel
 
 __all__ = [
+    'AccountGameStats',
     'Activity',
+    'ActivityAccounting',
     'ActivityData',
     'ActivityNotFoundError',
     'Actor',
@@ -272,6 +297,7 @@ __all__ = [
     'apptimer',
     'AppTimer',
     'AssetPackage',
+    'AssetPrefetcher',
     'basetime',
     'BaseTime',
     'basetimer',
@@ -292,6 +318,7 @@ __all__ = [
     'client_info_query_response',
     'Collision',
     'CollisionMesh',
+    'compile_playlist',
     'connect_to_party',
     'ContextError',
     'ContextRef',
@@ -314,6 +341,8 @@ __all__ = [
     'DropMessage',
     'DroppedMessage',
     'DualTeamSession',
+    'EffectBudget',
+    'EffectCounts',
     'emitfx',
     'EmptyPlayer',
     'EmptyTeam',
@@ -334,6 +363,7 @@ __all__ = [
     'get_default_free_for_all_playlist',
     'get_default_teams_playlist',
     'get_default_powerup_distribution',
+    'get_effect_counts',
     'get_filtered_map_name',
     'get_foreground_host_activity',
     'get_foreground_host_session',
@@ -346,6 +376,8 @@ __all__ = [
     'get_player_colors',
     'get_player_profile_colors',
     'get_player_profile_icon',
+    'get_playlist_hash',
+    'get_prefetch_counts',
     'get_public_party_enabled',
     'get_public_party_max_size',
     'get_random_names',
@@ -414,6 +446,7 @@ __all__ = [
     'Plugin',
     'PowerupAcceptMessage',
     'PowerupMessage',
+    'PrefetchCounts',
     'print_live_object_warnings',
     'printnodes',
     'protocol_version',
@@ -454,6 +487,7 @@ __all__ = [
     'set_public_party_queue_enabled',
     'set_public_party_stats_url',
     'set_player_rejoin_cooldown',
+    'set_playlist_scheduler',
     'set_max_players_override',
     'set_replay_speed_exponent',
     'set_touchscreen_editing',
@@ -475,6 +509,7 @@ __all__ = [
     'timer',
     'Timer',
     'timestring',
+    'TimingWheel',
     'UIScale',
     'UNHANDLED',
     'unlock_all_input',
@@ -482,6 +517,7 @@ __all__ = [
     'WeakCall',
     'WeakCallPartial',
     'WeakCallStrict',
+    'WeightedShuffleList',
     'WinnerGroup',
 ]
 
@@ -9,10 +9,11 @@ from typing import TYPE_CHECKING
 
 import babase
 import _bascenev1
+from bascenev1._actorregistry import ActorRegistry
 from bascenev1._dependency import DependencyComponent
+from bascenev1._playerindex import PlayerIndex
 from bascenev1._messages import UNHANDLED
 
-
 if TYPE_CHECKING:
     from typing import Any, Self
     import bascenev1
@@ -161,20 +162,20 @@ class Activity[PlayerT: bascenev1.Player, TeamT: bascenev1.Team](
         self._expired = False
         self._delay_delete_players: list[PlayerT] = []
         self._delay_delete_teams: list[TeamT] = []
-        self._players_that_left: list[weakref.ref[PlayerT]] = []
-        self._teams_that_left: list[weakref.ref[TeamT]] = []
+        self._players_that_left: weakref.WeakSet[PlayerT] = weakref.WeakSet()
+        self._teams_that_left: weakref.WeakSet[TeamT] = weakref.WeakSet()
         self._transitioning_out = False
 
-        # A handy place to put most actors; this list is pruned of dead
-        # actors regularly and these actors are insta-killed as the activity
-        # is dying.
-        self._actor_refs: list[bascenev1.Actor] = []
-        self._actor_weak_refs: list[weakref.ref[bascenev1.Actor]] = []
+        # A handy place to put most actors; actors drop out of this as
+        # they die or are freed and any remaining are insta-killed as
+        # the activity is dying.
+        self._actors = ActorRegistry()
         self._last_prune_dead_actors_time = babase.apptime()
         self._prune_dead_actors_timer: bascenev1.Timer | None = None
 
         self.teams = []
         self.players = []
+        self._player_index: PlayerIndex[PlayerT] = PlayerIndex()
 
         self.lobby = None
         self._stats: bascenev1.Stats | None = None
@@ -290,6 +291,10 @@ class Activity[PlayerT: bascenev1.Player, TeamT: bascenev1.Team](
                 repeat=True,
             )
 
+        classic = babase.app.classic
+        if classic is not None and classic.activity_accounting.enabled:
+            classic.activity_accounting.activity_expiring(self)
+
         # Run _expire in an empty context; nothing should be happening in
         # there except deleting things which requires no context.
         # (plus, _expire() runs in the destructor for un-run activities
@@ -315,7 +320,15 @@ class Activity[PlayerT: bascenev1.Player, TeamT: bascenev1.Team](
             from bascenev1._actor import Actor
 
             assert isinstance(actor, Actor)
-        self._actor_refs.append(actor)
+        self._actors.retain(actor)
+
+    def release_actor(self, actor: bascenev1.Actor) -> None:
+        """Release a strong-ref added by :meth:`retain_actor()`.
+
+        Retained actors are released automatically once they stop
+        existing, so this is only needed to release one early.
+        """
+        self._actors.release(actor)
 
     def add_actor_weak_ref(self, actor: bascenev1.Actor) -> None:
         """Add a weak-ref to a :class:`bascenev1.Actor` to the activity.
@@ -326,7 +339,20 @@ class Activity[PlayerT: bascenev1.Player, TeamT: bascenev1.Team](
             from bascenev1._actor import Actor
 
             assert isinstance(actor, Actor)
-        self._actor_weak_refs.append(weakref.ref(actor))
+        self._actors.add(actor)
+
+    def remove_actor_weak_ref(self, actor: bascenev1.Actor) -> None:
+        """Stop tracking a :class:`bascenev1.Actor` in the activity.
+
+        This is for actors being kept around to be reinitialized later
+        (which adds them back); they no longer count as live actors in
+        the meantime.
+        """
+        self._actors.remove(actor)
+
+    def get_actor_counts(self) -> dict[type[bascenev1.Actor], int]:
+        """Return counts of the activity's live actors by type."""
+        return self._actors.get_counts()
 
     @property
     def session(self) -> bascenev1.Session:
@@ -340,6 +366,17 @@ class Activity[PlayerT: bascenev1.Player, TeamT: bascenev1.Team](
             raise babase.SessionNotFoundError()
         return session
 
+    def get_players_for_client(self, client_id: int) -> list[PlayerT]:
+        """Return the activity's players belonging to a client.
+
+        The host's local players have a client id of -1.
+        """
+        return self._player_index.get_by_client_id(client_id)
+
+    def get_players_for_account(self, account_id: str) -> list[PlayerT]:
+        """Return the activity's players signed in with a v1 account id."""
+        return self._player_index.get_by_account_id(account_id)
+
     def on_player_join(self, player: PlayerT) -> None:
         """Called when a player joins the activity.
 
@@ -410,6 +447,10 @@ class Activity[PlayerT: bascenev1.Player, TeamT: bascenev1.Team](
         assert not self._has_transitioned_in
         self._has_transitioned_in = True
 
+        classic = babase.app.classic
+        if classic is not None and classic.activity_accounting.enabled:
+            classic.activity_accounting.activity_transitioned_in(self)
+
         # Set up the globals node based on our settings.
         with self.context:
             glb = self._globalsnode = _bascenev1.newnode('globals')
@@ -564,6 +605,7 @@ class Activity[PlayerT: bascenev1.Player, TeamT: bascenev1.Team](
             assert player not in self.players
             self.players.append(player)
             assert player in self.players
+            self._player_index.add(player, sessionplayer)
 
             try:
                 self.on_player_join(player)
@@ -589,6 +631,7 @@ class Activity[PlayerT: bascenev1.Player, TeamT: bascenev1.Team](
         assert player in self.players
         self.players.remove(player)
         assert player not in self.players
+        self._player_index.remove(player)
 
         with self.context:
             try:
@@ -607,7 +650,7 @@ class Activity[PlayerT: bascenev1.Player, TeamT: bascenev1.Team](
         # may not happen until activity end if something is holding refs
         # to it.
         self._delay_delete_players.append(player)
-        self._players_that_left.append(weakref.ref(player))
+        self._players_that_left.add(player)
 
     def add_team(self, sessionteam: bascenev1.SessionTeam) -> None:
         """Internal; Add a team to the activity
@@ -658,7 +701,7 @@ class Activity[PlayerT: bascenev1.Player, TeamT: bascenev1.Team](
         # may not happen until activity end if something is holding refs
         # to it.
         self._delay_delete_teams.append(team)
-        self._teams_that_left.append(weakref.ref(team))
+        self._teams_that_left.add(team)
 
     def _reset_session_player_for_no_activity(
         self, sessionplayer: bascenev1.SessionPlayer
@@ -745,6 +788,18 @@ class Activity[PlayerT: bascenev1.Player, TeamT: bascenev1.Team](
             # Note: no longer calling gc.get_referrers() here because it's
             # usage can bork stuff. (see notes at top of efro.debug)
             counter[0] += 1
+
+            # If we're keeping tabs on activities, note what we've got
+            # on this one (so we know what to look at if we die).
+            classic = babase.app.classic
+            if (
+                activity is not None
+                and classic is not None
+                and classic.activity_accounting.enabled
+            ):
+                classic.activity_accounting.activity_not_dying(
+                    activity, counter[0]
+                )
             if counter[0] == 4:
                 print('Killing app due to stuck activity... :-(')
                 babase.quit()
@@ -788,23 +843,18 @@ class Activity[PlayerT: bascenev1.Player, TeamT: bascenev1.Team](
 
     def _expire_actors(self) -> None:
         # Expire all Actors.
-        for actor_ref in self._actor_weak_refs:
-            actor = actor_ref()
-            if actor is not None:
-                babase.verify_object_death(actor)
-                try:
-                    actor.on_expire()
-                except Exception:
-                    logging.exception(
-                        'Error in Actor.on_expire() for %s.', actor_ref()
-                    )
+        for actor in self._actors.get_live_actors():
+            babase.verify_object_death(actor)
+            try:
+                actor.on_expire()
+            except Exception:
+                logging.exception('Error in Actor.on_expire() for %s.', actor)
 
     def _expire_players(self) -> None:
         # Issue warnings for any players that left the game but don't
         # get freed soon.
-        for ex_player in (p() for p in self._players_that_left):
-            if ex_player is not None:
-                babase.verify_object_death(ex_player)
+        for ex_player in list(self._players_that_left):
+            babase.verify_object_death(ex_player)
 
         for player in self.players:
             # This should allow our bascenev1.Player instance to be freed.
@@ -830,9 +880,8 @@ class Activity[PlayerT: bascenev1.Player, TeamT: bascenev1.Team](
     def _expire_teams(self) -> None:
         # Issue warnings for any teams that left the game but don't
         # get freed soon.
-        for ex_team in (p() for p in self._teams_that_left):
-            if ex_team is not None:
-                babase.verify_object_death(ex_team)
+        for ex_team in list(self._teams_that_left):
+            babase.verify_object_death(ex_team)
 
         for team in self.teams:
             # This should allow our bascenev1.Team instance to die.
@@ -860,21 +909,10 @@ class Activity[PlayerT: bascenev1.Player, TeamT: bascenev1.Team](
         self._delay_delete_players.clear()
         self._delay_delete_teams.clear()
 
-        # Clear out any dead weak-refs.
-        self._teams_that_left = [
-            t for t in self._teams_that_left if t() is not None
-        ]
-        self._players_that_left = [
-            p for p in self._players_that_left if p() is not None
-        ]
-
     def _prune_dead_actors(self) -> None:
         self._last_prune_dead_actors_time = babase.apptime()
 
-        # Prune our strong refs when the Actor's exists() call gives False
-        self._actor_refs = [a for a in self._actor_refs if a.exists()]
-
-        # Prune our weak refs once the Actor object has been freed.
-        self._actor_weak_refs = [
-            a for a in self._actor_weak_refs if a() is not None
-        ]
+        # Release retained actors whose exists() call gives False. Freed
+        # actors remove themselves from our registry so we don't need to
+        # look for those.
+        self._actors.prune()
@@ -0,0 +1,116 @@
+# Released under the MIT License. See LICENSE for details.
+#
+"""Defines ActorRegistry class."""
+from __future__ import annotations
+
+import weakref
+from typing import TYPE_CHECKING
+
+import babase
+import _bascenev1
+
+if TYPE_CHECKING:
+    from typing import Callable
+
+    import bascenev1
+
+
+class ActorRegistry:
+    """Keeps track of the actors in an :class:`~bascenev1.Activity`.
+
+    All actors created in the activity are tracked weakly and drop out
+    of the registry as soon as they are freed (via weak-ref callbacks),
+    so nothing ever needs to be scanned to find freed actors. Counts of
+    live actors by type are kept up to date as they come and go.
+
+    Actors can also be retained (strongly referenced) by the registry.
+    A retained actor is released once its :meth:`~bascenev1.Actor.exists()`
+    returns False. If it has a ``node`` attribute when retained, we
+    check it as soon as that node dies; otherwise we wait for the next
+    :meth:`prune()`, which only needs to look at retained actors.
+    """
+
+    def __init__(self) -> None:
+        self._live: dict[weakref.ref[bascenev1.Actor], type] = {}
+        self._counts: dict[type, int] = {}
+        self._retained: dict[int, bascenev1.Actor] = {}
+
+        # Freed-callback for our weak-refs. This only references us
+        # weakly so we don't form a cycle with our refs.
+        self._on_freed = _make_freed_callback(weakref.ref(self))
+
+    def add(self, actor: bascenev1.Actor) -> None:
+        """Start tracking an actor (weakly)."""
+        cls = type(actor)
+        self._live[weakref.ref(actor, self._on_freed)] = cls
+        self._counts[cls] = self._counts.get(cls, 0) + 1
+
+    def remove(self, actor: bascenev1.Actor) -> None:
+        """Stop tracking an actor (releasing it if we retain it)."""
+        self.release(actor)
+        self._remove(weakref.ref(actor))
+
+    def retain(self, actor: bascenev1.Actor) -> None:
+        """Hold a strong reference to an actor until it stops existing."""
+        key = id(actor)
+        if key in self._retained:
+            return
+        self._retained[key] = actor
+        node = getattr(actor, 'node', None)
+        if isinstance(node, _bascenev1.Node) and node:
+            node.add_death_action(
+                babase.WeakCallStrict(
+                    self._on_retained_node_death, weakref.ref(actor)
+                )
+            )
+
+    def release(self, actor: bascenev1.Actor) -> None:
+        """Drop our strong reference to an actor (if we have one)."""
+        self._retained.pop(id(actor), None)
+
+    def prune(self) -> None:
+        """Release retained actors which no longer exist."""
+        dead = [
+            key for key, actor in self._retained.items() if not actor.exists()
+        ]
+        for key in dead:
+            del self._retained[key]
+
+    def get_live_actors(self) -> list[bascenev1.Actor]:
+        """Return all actors which have not yet been freed."""
+        return [
+            actor for ref in list(self._live) if (actor := ref()) is not None
+        ]
+
+    def get_counts(self) -> dict[type, int]:
+        """Return counts of live actors by type."""
+        return dict(self._counts)
+
+    def _on_retained_node_death(
+        self, actor_ref: weakref.ref[bascenev1.Actor]
+    ) -> None:
+        actor = actor_ref()
+        if actor is not None and not actor.exists():
+            self.release(actor)
+
+    def _remove(self, ref: weakref.ref[bascenev1.Actor]) -> None:
+        cls = self._live.pop(ref, None)
+        if cls is None:
+            return
+        count = self._counts[cls] - 1
+        if count:
+            self._counts[cls] = count
+        else:
+            del self._counts[cls]
+
+
+def _make_freed_callback(
+    registry_ref: weakref.ref[ActorRegistry],
+) -> Callable[[weakref.ref[bascenev1.Actor]], None]:
+    def _on_freed(ref: weakref.ref[bascenev1.Actor]) -> None:
+        registry = registry_ref()
+        if registry is not None:
+            # pylint: disable=protected-access
+            registry._remove(ref)
+
+    return _on_freed
@@ -12,6 +12,11 @@ import babase
 
 import _bascenev1
 from bascenev1._session import Session
+from bascenev1._prefetch import AssetPrefetcher
+from bascenev1._playlistscheduler import (
+    WeightedShuffleList,
+    get_playlist_scheduler,
+)
 
 if TYPE_CHECKING:
     from typing import Any, Sequence
@@ -109,20 +114,27 @@ class MultiTeamSession(Session):
             else:
                 playlist = _playlist.get_default_free_for_all_playlist()
 
-        # Resolve types and whatnot to get our final playlist.
-        playlist_resolved = _playlist.filter_playlist(
+        # Resolve types and whatnot to get our final playlist
+        # (this is cached so repeat sessions skip most of the work).
+        playlist_resolved = _playlist.compile_playlist(
             playlist,
             sessiontype=type(self),
-            add_resolved_type=True,
             name='default teams' if self.use_teams else 'default ffa',
         )
 
         if not playlist_resolved:
             raise RuntimeError('Playlist contains no valid games.')
 
-        self._playlist = ShuffleList(
-            playlist_resolved, shuffle=self._playlist_randomize
-        )
+        scheduler, no_repeat_window, seed = get_playlist_scheduler()
+        self._playlist: ShuffleList | WeightedShuffleList
+        if self._playlist_randomize and scheduler == 'weighted':
+            self._playlist = WeightedShuffleList(
+                playlist_resolved, no_repeat_window=no_repeat_window, seed=seed
+            )
+        else:
+            self._playlist = ShuffleList(
+                playlist_resolved, shuffle=self._playlist_randomize
+            )
 
         # Get a game on deck ready to go.
         self._current_game_spec: dict[str, Any] | None = None
@@ -133,6 +145,7 @@ class MultiTeamSession(Session):
 
         # Go ahead and instantiate the next game we'll
         # use so it has lots of time to load.
+        self._prefetcher = AssetPrefetcher()
         self._instantiate_next_game()
 
         # Start in our custom join screen.
@@ -172,11 +185,21 @@ class MultiTeamSession(Session):
         assert isinstance(val, int)
         return val
 
+    def _pull_next_game_spec(self) -> dict[str, Any]:
+        if isinstance(self._playlist, WeightedShuffleList):
+            return self._playlist.pull_next(
+                player_count=sum(
+                    1 for player in self.sessionplayers if player.in_game
+                )
+            )
+        return self._playlist.pull_next()
+
     def _instantiate_next_game(self) -> None:
         self._next_game_instance = _bascenev1.newactivity(
             self._next_game_spec['resolved_type'],
             self._next_game_spec['settings'],
         )
+        self._prefetcher.start(self._next_game_instance)
 
     @override
     def on_activity_end(
@@ -222,9 +245,10 @@ class MultiTeamSession(Session):
                 self.stats.reset_accum()
 
             next_game = self._next_game_instance
+            self._prefetcher.finish(next_game)
 
             self._current_game_spec = self._next_game_spec
-            self._next_game_spec = self._playlist.pull_next()
+            self._next_game_spec = self._pull_next_game_spec()
             self._game_number += 1
 
             # Instantiate the next now so they have plenty of time to load.
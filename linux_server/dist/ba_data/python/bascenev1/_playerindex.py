@@ -0,0 +1,86 @@
+# Released under the MIT License. See LICENSE for details.
+#
+"""Defines PlayerIndex class."""
+from __future__ import annotations
+
+import logging
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    import bascenev1
+
+
+class PlayerIndex[T]:
+    """Indexes players by client id and v1 account id.
+
+    Used by :class:`~bascenev1.Session` and :class:`~bascenev1.Activity`
+    so finding the players belonging to a client or account doesn't
+    require scanning every player. Entries can be
+    :class:`~bascenev1.SessionPlayer` or :class:`~bascenev1.Player`
+    instances; either way the keys come from the underlying session
+    player when the entry is added. A single client can have multiple
+    players, so lookups return lists.
+    """
+
+    def __init__(self) -> None:
+        self._by_client_id: dict[int, list[T]] = {}
+        self._by_account_id: dict[str, list[T]] = {}
+        self._keys: dict[int, tuple[int | None, str | None]] = {}
+
+    def add(self, entry: T, sessionplayer: bascenev1.SessionPlayer) -> None:
+        """Add an entry keyed by a session-player's client/account ids."""
+        client_id: int | None
+        account_id: str | None
+        try:
+            client_id = sessionplayer.inputdevice.client_id
+        except Exception:
+            logging.exception('Error getting client id for %s.', entry)
+            client_id = None
+        try:
+            account_id = sessionplayer.get_v1_account_id()
+        except Exception:
+            logging.exception('Error getting account id for %s.', entry)
+            account_id = None
+
+        self._keys[id(entry)] = (client_id, account_id)
+        if client_id is not None:
+            self._by_client_id.setdefault(client_id, []).append(entry)
+        if account_id is not None:
+            self._by_account_id.setdefault(account_id, []).append(entry)
+
+    def remove(self, entry: T) -> None:
+        """Remove an entry (if present)."""
+        keys = self._keys.pop(id(entry), None)
+        if keys is None:
+            return
+        client_id, account_id = keys
+        if client_id is not None:
+            _remove_from(self._by_client_id, client_id, entry)
+        if account_id is not None:
+            _remove_from(self._by_account_id, account_id, entry)
+
+    def clear(self) -> None:
+        """Remove all entries."""
+        self._by_client_id.clear()
+        self._by_account_id.clear()
+        self._keys.clear()
+
+    def get_by_client_id(self, client_id: int) -> list[T]:
+        """Return entries for a client id (-1 is the host)."""
+        return list(self._by_client_id.get(client_id, ()))
+
+    def get_by_account_id(self, account_id: str) -> list[T]:
+        """Return entries for a v1 account id."""
+        return list(self._by_account_id.get(account_id, ()))
+
+
+def _remove_from[K, T](index: dict[K, list[T]], key: K, entry: T) -> None:
+    entries = index.get(key)
+    if entries is None:
+        return
+    for i, existing in enumerate(entries):
+        if existing is entry:
+            del entries[i]
+            break
+    if not entries:
+        del index[key]
@@ -4,7 +4,10 @@
 
 from __future__ import annotations
 
+import os
 import copy
+import json
+import hashlib
 import logging
 from typing import Any, TYPE_CHECKING
 
@@ -17,6 +20,16 @@ if TYPE_CHECKING:
 
 PlaylistType = list[dict[str, Any]]
 
+# How many compiled playlists we keep around on disk.
+MAX_COMPILED_PLAYLISTS = 20
+
+# Bump this when the compiled form changes to invalidate existing ones.
+_COMPILED_PLAYLIST_VERSION = 2
+
+# Compiled playlists by hash (minus their resolved types), least
+# recently used first; see compile_playlist(). Loaded lazily from disk.
+_compiled_playlists: dict[str, PlaylistType] | None = None
+
 
 def filter_playlist(
     playlist: PlaylistType,
@@ -222,6 +235,145 @@ def filter_playlist(
     return goodlist
 
 
+def get_playlist_hash(
+    playlist: PlaylistType, sessiontype: type[Session]
+) -> str:
+    """Return a hash identifying a playlist's compiled form.
+
+    This covers the playlist contents, the session type, the engine
+    build, and the set of available maps, so any of those changing
+    results in a recompile.
+    """
+    assert babase.app.classic is not None
+    hashsrc = json.dumps(
+        {
+            'v': _COMPILED_PLAYLIST_VERSION,
+            'p': playlist,
+            's': f'{sessiontype.__module__}.{sessiontype.__qualname__}',
+            'b': babase.app.env.engine_build_number,
+            'm': sorted(babase.app.classic.maps.keys()),
+        },
+        sort_keys=True,
+    )
+    return hashlib.sha256(hashsrc.encode()).hexdigest()
+
+
+def compile_playlist(
+    playlist: PlaylistType,
+    sessiontype: type[Session],
+    *,
+    name: str = '?',
+) -> PlaylistType:
+    """Return a filtered playlist with resolved types, using a cache.
+
+    This is equivalent to filter_playlist() with add_resolved_type=True,
+    but the filtered result is cached by get_playlist_hash() both in
+    memory and on disk, so repeat sessions (and server restarts) only
+    need to look up each game class and fill in any settings it has
+    gained instead of re-validating everything. Unowned content is
+    always removed. Results which had entries filtered out (due to
+    import errors, etc.) are not cached, so they get retried next time.
+    """
+    from bascenev1._gameactivity import GameActivity
+
+    global _compiled_playlists  # pylint: disable=global-statement
+
+    assert babase.app.classic is not None
+    store = babase.app.classic.store
+
+    # Ownership can change at runtime, so we only use the cache when
+    # there's nothing to filter out (which is always the case on
+    # headless builds).
+    if store.get_unowned_maps() or store.get_unowned_game_types():
+        return filter_playlist(
+            playlist, sessiontype, add_resolved_type=True, name=name
+        )
+
+    if _compiled_playlists is None:
+        _compiled_playlists = _load_compiled_playlists()
+
+    phash = get_playlist_hash(playlist, sessiontype)
+    compiled = _compiled_playlists.get(phash)
+    if compiled is not None:
+        try:
+            resolved = copy.deepcopy(compiled)
+            for entry in resolved:
+                gameclass = babase.getclass(entry['type'], GameActivity)
+                entry['resolved_type'] = gameclass
+                for setting in gameclass.get_available_settings(sessiontype):
+                    if setting.name not in entry['settings']:
+                        entry['settings'][setting.name] = setting.default
+
+            # Keep recently used playlists at the end so they're the
+            # last to be evicted.
+            if next(reversed(_compiled_playlists)) != phash:
+                _compiled_playlists[phash] = _compiled_playlists.pop(phash)
+                babase.app.threadpool.submit_no_wait(
+                    _save_compiled_playlists,
+                    copy.deepcopy(_compiled_playlists),
+                )
+            return resolved
+        except Exception:
+            logging.warning(
+                'Compiled playlist \'%s\' is no longer valid; recompiling.',
+                name,
+                exc_info=True,
+            )
+            del _compiled_playlists[phash]
+
+    resolved = filter_playlist(
+        playlist, sessiontype, add_resolved_type=True, name=name
+    )
+
+    # Don't remember failures; whatever caused them may get fixed.
+    if len(resolved) != len(playlist):
+        return resolved
+
+    _compiled_playlists[phash] = [
+        {key: val for key, val in entry.items() if key != 'resolved_type'}
+        for entry in copy.deepcopy(resolved)
+    ]
+    while len(_compiled_playlists) > MAX_COMPILED_PLAYLISTS:
+        del _compiled_playlists[next(iter(_compiled_playlists))]
+    babase.app.threadpool.submit_no_wait(
+        _save_compiled_playlists, copy.deepcopy(_compiled_playlists)
+    )
+    return resolved
+
+
+def _get_compiled_playlists_path() -> str:
+    return os.path.join(
+        babase.app.env.cache_directory, 'compiled_playlists.json'
+    )
+
+
+def _load_compiled_playlists() -> dict[str, PlaylistType]:
+    path = _get_compiled_playlists_path()
+    if not os.path.exists(path):
+        return {}
+    try:
+        with open(path, encoding='utf-8') as infile:
+            playlists = json.loads(infile.read())
+        if not isinstance(playlists, dict):
+            raise TypeError(f'Expected a dict; got {type(playlists)}.')
+        return playlists
+    except Exception:
+        logging.exception('Error loading compiled playlists.')
+        return {}
+
+
+def _save_compiled_playlists(playlists: dict[str, PlaylistType]) -> None:
+    path = _get_compiled_playlists_path()
+    try:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmppath = f'{path}.tmp'
+        with open(tmppath, 'w', encoding='utf-8') as outfile:
+            outfile.write(json.dumps(playlists))
+        os.replace(tmppath, path)
+    except Exception:
+        logging.exception('Error saving compiled playlists.')
+
+
 def get_default_free_for_all_playlist() -> PlaylistType:
     """Return a default playlist for free-for-all mode."""
 
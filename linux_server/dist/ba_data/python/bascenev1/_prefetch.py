@@ -0,0 +1,130 @@
+# Released under the MIT License. See LICENSE for details.
+#
+"""Functionality related to warming media for upcoming activities."""
+from __future__ import annotations
+
+import copy
+import weakref
+import logging
+from collections import deque
+from dataclasses import dataclass
+from typing import TYPE_CHECKING
+
+import babase
+
+if TYPE_CHECKING:
+    from typing import Any, Callable
+
+    import bascenev1
+
+
+@dataclass
+class PrefetchCounts:
+    """Totals for asset prefetching across all sessions."""
+
+    #: Games which began with all of their prefetching done.
+    hits: int = 0
+
+    #: Games which began before their prefetching finished (the rest
+    #: of their media gets loaded as they run, as it would without
+    #: prefetching).
+    misses: int = 0
+
+    #: Prefetch calls run.
+    calls: int = 0
+
+    #: Prefetch calls which raised exceptions.
+    errors: int = 0
+
+
+_g_counts = PrefetchCounts()
+
+
+def get_prefetch_counts() -> PrefetchCounts:
+    """Return totals for asset prefetching so far."""
+    return copy.copy(_g_counts)
+
+
+class AssetPrefetcher:
+    """Warms media for the game a session will run next.
+
+    Sessions create their next game well ahead of time, but most of its
+    media (character models, bomb and powerup textures, etc) only gets
+    requested once it begins, which can cause hitches as it starts.
+    Once started with an upcoming activity, this runs that activity's
+    :meth:`~bascenev1.GameActivity.get_prefetch_calls()` in its context
+    one at a time on a short timer, spreading the work across the
+    current activity's frames instead.
+    """
+
+    # Wait this long before starting so we don't compete with whatever
+    # is just beginning.
+    START_DELAY = 2.0
+
+    # Time between individual calls.
+    CALL_INTERVAL = 0.1
+
+    def __init__(self) -> None:
+        self._activity: weakref.ref[bascenev1.GameActivity] | None = None
+        self._calls: deque[Callable[[], Any]] | None = None
+        self._timer: babase.AppTimer | None = None
+
+    def start(self, activity: bascenev1.GameActivity) -> None:
+        """Begin warming media for an activity that will run next.
+
+        Replaces any activity previously being warmed.
+        """
+        self._activity = weakref.ref(activity)
+        self._calls = None
+        with babase.ContextRef.empty():
+            self._timer = babase.AppTimer(
+                self.START_DELAY, babase.WeakCallStrict(self._begin)
+            )
+
+    def finish(self, activity: bascenev1.Activity) -> None:
+        """Should be called as the activity passed to start() begins.
+
+        Stops any remaining prefetching and records a hit or miss.
+        """
+        if self._activity is not None and self._activity() is activity:
+            if self._calls is not None and not self._calls:
+                _g_counts.hits += 1
+            else:
+                _g_counts.misses += 1
+        self._activity = None
+        self._calls = None
+        self._timer = None
+
+    def _begin(self) -> None:
+        activity = None if self._activity is None else self._activity()
+        if activity is None or activity.expired:
+            self._timer = None
+            return
+        try:
+            self._calls = deque(activity.get_prefetch_calls())
+        except Exception:
+            logging.exception('Error getting prefetch calls for %s.', activity)
+            _g_counts.errors += 1
+            self._calls = deque()
+        with babase.ContextRef.empty():
+            self._timer = babase.AppTimer(
+                self.CALL_INTERVAL,
+                babase.WeakCallStrict(self._run_next),
+                repeat=True,
+            )
+
+    def _run_next(self) -> None:
+        activity = None if self._activity is None else self._activity()
+        if activity is None or activity.expired or not self._calls:
+            self._timer = None
+            return
+        call = self._calls.popleft()
+        _g_counts.calls += 1
+        try:
+            with activity.context:
+                call()
+        except Exception:
+            logging.exception('Error in prefetch call for %s.', activity)
+            _g_counts.errors += 1
+        if not self._calls:
+            self._timer = None
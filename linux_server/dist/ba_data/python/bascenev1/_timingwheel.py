@@ -0,0 +1,226 @@
+# Released under the MIT License. See LICENSE for details.
+#
+"""Defines TimingWheel class."""
+from __future__ import annotations
+
+from typing import TYPE_CHECKING
+
+import babase
+
+if TYPE_CHECKING:
+    from typing import Callable
+
+
+class _Entry[K, V]:
+    __slots__ = ('key', 'value', 'expire_time', 'expire_tick', 'bucket')
+
+    def __init__(
+        self, key: K, value: V, expire_time: float, expire_tick: int
+    ) -> None:
+        self.key = key
+        self.value = value
+        self.expire_time = expire_time
+        self.expire_tick = expire_tick
+        self.bucket: dict[K, _Entry[K, V]] | None = None
+
+
+class TimingWheel[K, V]:
+    """Keeps keys around until they expire after a given delay.
+
+    Meant for things like rejoin cooldowns, bans, rate limits and vote
+    windows, where lots of keys each need to go away at some point but
+    creating a timer per key would be wasteful (especially when a flood
+    of clients is joining). Adding and cancelling keys is O(1) and a
+    single timer ticks for the whole wheel, and only while it has
+    entries.
+
+    Entries sit in buckets for the tick they expire on. The wheel is
+    hierarchical: the first level has a bucket per tick, and each
+    following level's buckets cover a full turn of the level below. As
+    a higher level's bucket comes due, its entries are moved down to
+    lower levels, so no entry is looked at more than once per level.
+    With the defaults, a resolution of one second covers over half a
+    year before entries get parked at the top level.
+
+    Lookups check expire times themselves, so a key never outlives its
+    delay even if its bucket hasn't come due yet; the resolution only
+    affects how soon on_expire is called.
+
+    By default, time is measured with :meth:`babase.apptime()`. Pass a
+    different clock (such as :meth:`time.time()`) for entries that
+    should expire by the wall clock instead.
+    """
+
+    def __init__(
+        self,
+        resolution: float = 1.0,
+        *,
+        on_expire: Callable[[K, V], None] | None = None,
+        clock: Callable[[], float] | None = None,
+        slot_count: int = 64,
+        level_count: int = 4,
+    ) -> None:
+        self._resolution = resolution
+        self._on_expire = on_expire
+        self._clock = babase.apptime if clock is None else clock
+        self._slot_count = slot_count
+        self._levels: list[list[dict[K, _Entry[K, V]]]] = [
+            [{} for _ in range(slot_count)] for _ in range(level_count)
+        ]
+        self._entries: dict[K, _Entry[K, V]] = {}
+        self._tick = self._tick_for_time(self._clock())
+        self._timer: babase.AppTimer | None = None
+
+    def __len__(self) -> int:
+        """The number of entries (some may have expired but not yet fired)."""
+        return len(self._entries)
+
+    def __contains__(self, key: K) -> bool:
+        return self.remaining(key) is not None
+
+    def add(self, key: K, delay: float, value: V) -> None:
+        """Add a key which expires after delay seconds.
+
+        Replaces any existing entry for the key.
+        """
+        self.cancel(key)
+        now = self._clock()
+        if not self._entries:
+            # We may have been idle a while; nothing to catch up on.
+            self._tick = self._tick_for_time(now)
+        expire_time = now + max(0.0, delay)
+        entry = _Entry(
+            key, value, expire_time, self._tick_for_time(expire_time) + 1
+        )
+        self._entries[key] = entry
+        self._place(entry)
+        if self._timer is None:
+            with babase.ContextRef.empty():
+                self._timer = babase.AppTimer(
+                    self._resolution,
+                    babase.WeakCallStrict(self._advance),
+                    repeat=True,
+                )
+
+    def cancel(self, key: K) -> bool:
+        """Remove a key without expiring it.
+
+        Returns whether the key was present.
+        """
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return False
+        assert entry.bucket is not None
+        del entry.bucket[key]
+        entry.bucket = None
+        if not self._entries:
+            self._timer = None
+        return True
+
+    def clear(self) -> None:
+        """Remove all keys without expiring them."""
+        for level in self._levels:
+            for bucket in level:
+                bucket.clear()
+        self._entries.clear()
+        self._timer = None
+
+    def get(self, key: K) -> V | None:
+        """Return the value for a key (None if absent or expired)."""
+        entry = self._entries.get(key)
+        if entry is None or entry.expire_time <= self._clock():
+            return None
+        return entry.value
+
+    def remaining(self, key: K) -> float | None:
+        """Return seconds until a key expires (None if absent or expired)."""
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        remaining = entry.expire_time - self._clock()
+        return remaining if remaining > 0.0 else None
+
+    def _tick_for_time(self, value: float) -> int:
+        return int(value // self._resolution)
+
+    def _place(self, entry: _Entry[K, V]) -> None:
+        slot_count = self._slot_count
+        delta = max(0, entry.expire_tick - self._tick)
+
+        # Entries beyond our range get parked as far out as we can go
+        # and placed again as they get closer.
+        delta = min(delta, slot_count ** len(self._levels) - 1)
+        level = 0
+        width = 1
+        while delta >= width * slot_count:
+            level += 1
+            width *= slot_count
+        bucket = self._levels[level][
+            ((self._tick + delta) // width) % slot_count
+        ]
+        bucket[entry.key] = entry
+        entry.bucket = bucket
+
+    def _advance(self) -> None:
+        now = self._clock()
+        target = self._tick_for_time(now)
+        if target - self._tick > self._slot_count ** len(self._levels):
+            # We've fallen way behind (the clock jumped or we were
+            # suspended); quicker to start over than to step through.
+            self._rebuild(target, now)
+        while self._tick < target and self._entries:
+            self._tick += 1
+            self._process_tick(now)
+        if not self._entries:
+            self._timer = None
+
+    def _process_tick(self, now: float) -> None:
+        tick = self._tick
+        slot_count = self._slot_count
+
+        # Move entries down from any higher-level buckets now coming due
+        # (highest first so they can keep moving down).
+        for level in range(len(self._levels) - 1, 0, -1):
+            width = slot_count**level
+            if tick % width == 0:
+                self._cascade(level, (tick // width) % slot_count)
+
+        index = tick % slot_count
+        bucket = self._levels[0][index]
+        if not bucket:
+            return
+        self._levels[0][index] = {}
+        for entry in list(bucket.values()):
+            entry.bucket = None
+            if self._entries.get(entry.key) is not entry:
+                continue
+            if entry.expire_time > now:
+                # Can only happen if the clock went backwards.
+                entry.expire_tick = max(entry.expire_tick, tick + 1)
+                self._place(entry)
+                continue
+            del self._entries[entry.key]
+            if self._on_expire is not None:
+                self._on_expire(entry.key, entry.value)
+
+    def _cascade(self, level: int, index: int) -> None:
+        bucket = self._levels[level][index]
+        if not bucket:
+            return
+        self._levels[level][index] = {}
+        for entry in bucket.values():
+            self._place(entry)
+
+    def _rebuild(self, tick: int, now: float) -> None:
+        for level in self._levels:
+            for bucket in level:
+                bucket.clear()
+        self._tick = tick
+        for entry in list(self._entries.values()):
+            if entry.expire_time > now:
+                self._place(entry)
+                continue
+            entry.bucket = None
+            del self._entries[entry.key]
+            if self._on_expire is not None:
+                self._on_expire(entry.key, entry.value)
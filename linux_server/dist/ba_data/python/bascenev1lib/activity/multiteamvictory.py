@@ -87,9 +87,8 @@ class TeamSeriesVictoryScoreScreenActivity(MultiTeamScoreScreenActivity):
                     2
                 ].get_icon()
         else:
-            for _pkey, prec in self.stats.get_records().items():
+            for prec in self.stats.get_sorted_records('score'):
                 player_entries.append((prec.score, prec.name_full, prec))
-            player_entries.sort(reverse=True, key=lambda x: x[0])
 
         ts_height = 300.0
         ts_h_offs = -390.0
@@ -0,0 +1,84 @@
+# Released under the MIT License. See LICENSE for details.
+#
+"""Functionality for finding targets for bots."""
+
+from __future__ import annotations
+
+import math
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from typing import Sequence
+
+
+class BotTargetIndex:
+    """Positions and velocities of things bots can go after.
+
+    Bot-sets fill one of these in each update and then look up the
+    nearest target for all of the bots they are updating in a single
+    pass. Everything is kept as plain floats, so no bs.Vec3
+    objects are created for the lookups themselves.
+    """
+
+    # Targets more than this far below a bot are ignored (keeps bots
+    # from following players off cliffs).
+    MAX_DROP = 5.0
+
+    def __init__(self) -> None:
+        self._points: list[tuple[float, float, float]] = []
+        self._targets: list[tuple[Sequence[float], Sequence[float]]] = []
+
+    def __len__(self) -> int:
+        return len(self._targets)
+
+    def add(self, position: Sequence[float], velocity: Sequence[float]) -> None:
+        """Add a target."""
+        self._points.append((position[0], position[1], position[2]))
+        self._targets.append((position, velocity))
+
+    def find_nearest(
+        self, positions: Sequence[Sequence[float] | None]
+    ) -> list[tuple[Sequence[float], Sequence[float]] | None]:
+        """Return the nearest target for each of the provided positions.
+
+        Targets too far below a position are skipped. Results are None
+        for positions with no target (or which are None themselves).
+        """
+        return self.find_nearest_with_distances(positions)[0]
+
+    def find_nearest_with_distances(
+        self, positions: Sequence[Sequence[float] | None]
+    ) -> tuple[
+        list[tuple[Sequence[float], Sequence[float]] | None],
+        list[float | None],
+    ]:
+        """Like find_nearest() but also returns distances to targets."""
+        targets = self._targets
+        if not targets:
+            return [None] * len(positions), [None] * len(positions)
+        points = self._points
+        max_drop = self.MAX_DROP
+        results: list[tuple[Sequence[float], Sequence[float]] | None] = []
+        distances: list[float | None] = []
+        for position in positions:
+            if position is None:
+                results.append(None)
+                distances.append(None)
+                continue
+            floor = position[1] - max_drop
+            closest = -1
+            closest_dist = 0.0
+            for i, point in enumerate(points):
+                if point[1] <= floor:
+                    continue
+                dist = math.dist(point, position)
+                if closest == -1 or dist < closest_dist:
+                    closest = i
+                    closest_dist = dist
+            if closest == -1:
+                results.append(None)
+                distances.append(None)
+            else:
+                results.append(targets[closest])
+                distances.append(closest_dist)
+        return results, distances
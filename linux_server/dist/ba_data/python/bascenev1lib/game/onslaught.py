@@ -788,7 +788,9 @@ class OnslaughtGame(bs.CoopGameActivity[Player, Team]):
 
         self.setup_low_life_warning_sound()
         self._update_scores()
-        self._bots = SpazBotSet()
+
+        # We spawn lots of the same bots wave after wave; recycle them.
+        self._bots = SpazBotSet(pool_size=10)
         bs.timer(4.0, self._start_updating_waves)
 
     def _get_dist_grp_totals(self, grps: list[Any]) -> tuple[int, int]:
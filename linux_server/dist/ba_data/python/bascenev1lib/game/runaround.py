@@ -180,7 +180,9 @@ class RunaroundGame(bs.CoopGameActivity[Player, Team]):
         self._exclude_powerups: list[str] | None = None
         self._have_tnt: bool | None = None
         self._waves: list[Wave] | None = None
-        self._bots = SpazBotSet()
+
+        # We spawn lots of the same bots wave after wave; recycle them.
+        self._bots = SpazBotSet(pool_size=10)
         self._tntspawner: TNTSpawner | None = None
         self._lives_bg: bs.NodeActor | None = None
         self._start_lives = 10